@@ -1,6 +1,12 @@
+import functools
+import os
 import pygame
 import sys
-from sudoku_generator import Board
+from sudoku_board import Board
+from sudoku_generator import SYMBOLS
+from sudoku_library import PuzzleLibrary
+from sudoku_pool import PuzzlePool
+from sudoku_variants import RULES
 
 # Initialize Pygame
 pygame.init()
@@ -16,233 +22,366 @@ FONT = pygame.font.SysFont("comicsans", 40)
 BOARD_BACKGROUND_COLOR = (211, 232, 255)
 TEXT_INPUT_COLOR = (128, 128, 128)
 
+# The bottom menu sits below the board
+MENU_TOP = HEIGHT - 60
+
+# Upper bound on redraws per second while input is arriving
+FPS = 60
+
+# Start screen labels of the variant rules
+RULE_LABELS = {
+    'diagonal': "Diagonal",
+    'windoku': "Windoku",
+    'even_odd': "Even/Odd",
+    'killer': "Killer",
+}
+
+# Ready-made puzzles are kept here between runs
+POOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "puzzle_pool.json")
+
 # Screen Setup
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Sudoku")
 
-def draw_game_start():
+'''
+The start, menu and end screens never change, so each one is rendered into a
+Surface the first time it is needed and reused after that (lru_cache). Only the
+start screen's size and rule toggles depend on the current choices; those are
+drawn over it from small cached buttons, so one full-window Surface serves every
+combination
+'''
+@functools.lru_cache(maxsize=None)
+def build_button(label, font_size, padding, color):
+    text = pygame.font.Font(None, font_size).render(label, 0, (255, 255, 255))
+    button_surface = pygame.Surface((text.get_size()[0] + 2 * padding, text.get_size()[1] + 2 * padding))
+    button_surface.fill(color)
+    button_surface.blit(text, (padding, padding))
+    return button_surface
+
+@functools.lru_cache(maxsize=None)
+def build_game_start():
     # Title font
     start_title_font = pygame.font.Font(None, 50)
     mode_display_font = pygame.font.Font(None, 45)
     button_font = pygame.font.Font(None, 30)
 
     # Background color
-    screen.fill(BOARD_BACKGROUND_COLOR)
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    surface.fill(BOARD_BACKGROUND_COLOR)
 
     # Draw title
     title_surface = start_title_font.render("Welcome to Sudoku", 0, (0, 0, 0))
     title_rectangle = title_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 150))
-    screen.blit(title_surface, title_rectangle)    # draws the title with rect
+    surface.blit(title_surface, title_rectangle)    # draws the title with rect
 
     # Game Mode Selection
     mode_surface = mode_display_font.render("Select Game Mode:", 0, (0, 0, 0))
     mode_rectangle = mode_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 10))
-    screen.blit(mode_surface, mode_rectangle)
-
-    # Buttons: text
-    easy_text = button_font.render("Easy", 0, (255, 255, 255))
-    medium_text = button_font.render("Medium", 0, (255, 255, 255))
-    hard_text = button_font.render("Hard", 0, (255, 255, 255))
-
-    # Buttons: background and color
-    easy_surface = pygame.Surface((easy_text.get_size()[0] + 20, easy_text.get_size()[1] + 20))
-    easy_surface.fill((0, 33, 165))
-    easy_surface.blit(easy_text, (10, 10))
-    medium_surface = pygame.Surface((medium_text.get_size()[0] + 20, medium_text.get_size()[1] + 20))
-    medium_surface.fill((0, 33, 165))
-    medium_surface.blit(medium_text, (10, 10))
-    hard_surface = pygame.Surface((hard_text.get_size()[0] + 20, hard_text.get_size()[1] + 20))
-    hard_surface.fill((0, 33, 165))
-    hard_surface.blit(hard_text, (10, 10))
-
-    # Buttons: Rectangle
-    easy_rectangle = easy_surface.get_rect(center=(WIDTH // 2 - 150, HEIGHT // 3 + 170))
-    medium_rectangle = medium_surface.get_rect(center=(WIDTH // 2, HEIGHT // 3 + 170))
-    hard_rectangle = hard_surface.get_rect(center=(WIDTH // 2 + 150, HEIGHT // 3 + 170))
-
-    # Draw Buttons
-    screen.blit(easy_surface, easy_rectangle)
-    screen.blit(medium_surface, medium_rectangle)
-    screen.blit(hard_surface, hard_rectangle)
-
-    pygame.display.update()
-
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                quit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if easy_rectangle.collidepoint(event.pos):
-                    return "easy"
-                if medium_rectangle.collidepoint(event.pos):
-                    return "medium"
-                if hard_rectangle.collidepoint(event.pos):
-                    return "hard"
-    pygame.display.update()
-
-def bottom_menu():
+    surface.blit(mode_surface, mode_rectangle)
+
+    # Buttons: text, background and rectangle
+    buttons = {}
+    for difficulty, label, offset in (("easy", "Easy", -150), ("medium", "Medium", 0), ("hard", "Hard", 150)):
+        button_surface = build_button(label, 30, 10, (0, 33, 165))
+        buttons[difficulty] = button_surface.get_rect(center=(WIDTH // 2 + offset, HEIGHT // 3 + 170))
+
+        # Draw Buttons
+        surface.blit(button_surface, buttons[difficulty])
+
+    # Board size selection; the buttons are drawn by draw_game_start
+    size_surface = button_font.render("Board Size:", 0, (0, 0, 0))
+    surface.blit(size_surface, size_surface.get_rect(center=(WIDTH // 2, HEIGHT // 3 + 240)))
+    size_buttons = {}
+    for size, offset in ((2, -180), (3, -60), (4, 60), (5, 180)):
+        button_surface = build_button(f"{size * size}x{size * size}", 30, 10, (128, 128, 128))
+        size_buttons[size] = button_surface.get_rect(center=(WIDTH // 2 + offset, HEIGHT // 3 + 285))
+
+    # Variant rules, each toggled on and off; the buttons are drawn by draw_game_start
+    label = pygame.font.Font(None, 25).render("Rules:", 0, (0, 0, 0))
+    surfaces = [(rule, build_button(RULE_LABELS[rule], 25, 8, (128, 128, 128))) for rule in RULES]
+    x = (WIDTH - label.get_width() - sum(b.get_width() + 10 for _, b in surfaces)) // 2
+    y = HEIGHT // 3 + 345
+    surface.blit(label, label.get_rect(midleft=(x, y)))
+    x += label.get_width() + 10
+    rule_buttons = {}
+    for rule, button_surface in surfaces:
+        rule_buttons[rule] = button_surface.get_rect(midleft=(x, y))
+        x += button_surface.get_width() + 10
+
+    return surface, buttons, size_buttons, rule_buttons
+
+@functools.lru_cache(maxsize=None)
+def board_font(box_length):
+    # Scale the digits to the cell size; 9x9 boards keep the standard font
+    if box_length == 3:
+        return FONT
+    return pygame.font.SysFont("comicsans", (WIDTH // (box_length * box_length)) * 2 // 3)
+
+@functools.lru_cache(maxsize=None)
+def build_bottom_menu():
     # Button font
     bottom_button_font = pygame.font.Font(None, 25)
+    button_color = (255, 140, 0)  # Orange color
 
-    # Buttons: text
-    reset_text = bottom_button_font.render("RESET", 0, (255, 255, 255))
-    restart_text = bottom_button_font.render("RESTART", 0, (255, 255, 255))
-    exit_text = bottom_button_font.render("EXIT", 0, (255, 255, 255))
-    solve_text = bottom_button_font.render("SOLVE", 0, (255, 255, 255))
+    # The menu strip below the board
+    surface = pygame.Surface((WIDTH, HEIGHT - MENU_TOP))
+    surface.fill(BOARD_BACKGROUND_COLOR)
 
-    # Buttons: background and color
-    button_color = (255, 140, 0)  # Orange color
-    reset_surface = pygame.Surface((reset_text.get_size()[0] + 20, reset_text.get_size()[1] + 20))
-    reset_surface.fill(button_color)
-    reset_surface.blit(reset_text, (10, 10))
-    restart_surface = pygame.Surface((restart_text.get_size()[0] + 20, restart_text.get_size()[1] + 20))
-    restart_surface.fill(button_color)
-    restart_surface.blit(restart_text, (10, 10))
-    exit_surface = pygame.Surface((exit_text.get_size()[0] + 20, exit_text.get_size()[1] + 20))
-    exit_surface.fill(button_color)
-    exit_surface.blit(exit_text, (10, 10))
-    solve_surface = pygame.Surface((solve_text.get_size()[0] + 20, solve_text.get_size()[1] + 20))
-    solve_surface.fill(button_color)
-    solve_surface.blit(solve_text, (10, 10))
-
-    # Buttons: Rectangle
-    reset_rectangle = reset_surface.get_rect(center=(WIDTH // 2 - 155, HEIGHT - 30))
-    restart_rectangle = restart_surface.get_rect(center=(WIDTH // 2 - 50, HEIGHT - 30))
-    exit_rectangle = exit_surface.get_rect(center=(WIDTH // 2 + 50, HEIGHT - 30))
-    solve_rectangle = solve_surface.get_rect(center=(WIDTH // 2 + 137, HEIGHT - 30))
-
-    # Draw Buttons
-    screen.blit(reset_surface, reset_rectangle)
-    screen.blit(restart_surface, restart_rectangle)
-    screen.blit(exit_surface, exit_rectangle)
-    screen.blit(solve_surface, solve_rectangle)
+    # Buttons: text, background and rectangle (in window coordinates)
+    rectangles = []
+    for label, offset in (("RESET", -155), ("RESTART", -50), ("EXIT", 50), ("SOLVE", 137)):
+        text = bottom_button_font.render(label, 0, (255, 255, 255))
+        button_surface = pygame.Surface((text.get_size()[0] + 20, text.get_size()[1] + 20))
+        button_surface.fill(button_color)
+        button_surface.blit(text, (10, 10))
+        rectangle = button_surface.get_rect(center=(WIDTH // 2 + offset, HEIGHT - 30))
+        rectangles.append(rectangle)
 
+        # Draw Buttons
+        surface.blit(button_surface, rectangle.move(0, -MENU_TOP))
 
-    pygame.display.update()
+    return surface, tuple(rectangles)
 
-    return reset_rectangle, restart_rectangle, exit_rectangle, solve_rectangle
-def draw_end_screen(message):
+@functools.lru_cache(maxsize=None)
+def build_end_screen(message):
     end_title_font = pygame.font.Font(None, 75)
     button_font = pygame.font.Font(None, 30)
 
-    screen.fill(BOARD_BACKGROUND_COLOR)
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    surface.fill(BOARD_BACKGROUND_COLOR)
 
     title_surface = end_title_font.render(message, 0, (0, 0, 0))
     title_rectangle = title_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 100))
-    screen.blit(title_surface, title_rectangle)
+    surface.blit(title_surface, title_rectangle)
 
     button_text = button_font.render("EXIT" if message == "Game Won!" else "RESTART", 0, (255, 255, 255))
     button_surface = pygame.Surface((button_text.get_size()[0] + 20, button_text.get_size()[1] + 20))
     button_surface.fill((255, 140, 0))
     button_surface.blit(button_text, (10, 10))
     button_rectangle = button_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
+    surface.blit(button_surface, button_rectangle)
+
+    return surface, button_rectangle
+
+def draw_game_start(box_length=3, rules=()):
+    surface, buttons, size_buttons, rule_buttons = build_game_start()
+    screen.blit(surface, (0, 0))
+
+    # The chosen size and rules are highlighted; windoku is only offered up to 9x9
+    for size, rectangle in size_buttons.items():
+        color = (0, 33, 165) if size == box_length else (128, 128, 128)
+        screen.blit(build_button(f"{size * size}x{size * size}", 30, 10, color), rectangle)
+    for rule, rectangle in rule_buttons.items():
+        if rule == 'windoku' and box_length > 3:
+            color = (190, 190, 190)
+        else:
+            color = (0, 33, 165) if rule in rules else (128, 128, 128)
+        screen.blit(build_button(RULE_LABELS[rule], 25, 8, color), rectangle)
+    pygame.display.update()
+
+    return buttons, size_buttons, rule_buttons
+
+def bottom_menu():
+    surface, rectangles = build_bottom_menu()
+    screen.blit(surface, (0, MENU_TOP))
+    return rectangles
 
-    screen.blit(button_surface, button_rectangle)
+def draw_end_screen(message):
+    surface, button_rectangle = build_end_screen(message)
+    screen.blit(surface, (0, 0))
     pygame.display.update()
 
     return button_rectangle
 
+# Scenes the game can be in
+START, PLAYING, WON, LOST = "start", "playing", "won", "lost"
+
+# Keys that sketch a value into the selected cell: 1-9, then A-P for 10-25
+DIGIT_KEYS = {}
+for digit in range(1, 10):
+    DIGIT_KEYS[getattr(pygame, f"K_{digit}")] = digit
+    DIGIT_KEYS[getattr(pygame, f"K_KP{digit}")] = digit
+for value in range(10, 26):
+    DIGIT_KEYS[getattr(pygame, f"K_{SYMBOLS[value - 1].lower()}")] = value
+
+ARROW_KEYS = {
+    pygame.K_UP: 'up',
+    pygame.K_DOWN: 'down',
+    pygame.K_LEFT: 'left',
+    pygame.K_RIGHT: 'right',
+}
+
+# H shows a hint and P toggles pencil marks; on 25x25 boards those letters are
+# values, so F1 and F2 do the same everywhere
+HINT_KEYS = (pygame.K_h, pygame.K_F1)
+PENCIL_KEYS = (pygame.K_p, pygame.K_F2)
+
+class Game:
+    '''
+    Scene controller for one window
+    The game moves between the start screen, playing, won and lost scenes. Starting
+    a new game replaces the old Board instead of nesting another game loop, so
+    memory stays flat however many games are played.
+    '''
+    def __init__(self, pool=None):
+        self.pool = pool
+        self.board = None
+        self.box_length = 3
+        self.rules = ()  # Variant rules from sudoku_variants.RULES, in RULES order
+        self.running = True
+        self.enter_start()
+
+    def enter_start(self):
+        self.scene = START
+        pygame.display.set_caption("Sudoku")
+        self.board = None  # Drop the previous game
+        self.buttons, self.size_buttons, self.rule_buttons = draw_game_start(self.box_length, self.rules)
+
+    def enter_playing(self, difficulty):
+        self.scene = PLAYING
+        # The pool only holds classic 9x9 puzzles
+        pool = self.pool if self.box_length == 3 and not self.rules else None
+        self.board = Board(WIDTH, MENU_TOP, screen, difficulty, LINE_COLOR, board_font(self.box_length), pool,
+                           self.box_length, rules=self.rules)
+
+        # Draw the whole window once; after that only changed cells are redrawn
+        screen.fill(BOARD_BACKGROUND_COLOR)
+        self.board.draw()
+
+        # Draw Bottom Menu
+        self.menu = bottom_menu()
+        pygame.display.update()
+
+    def enter_end(self, scene, message):
+        self.scene = scene
+        self.board = None
+        self.end_button = draw_end_screen(message)
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif self.scene == START:
+            self.handle_start_event(event)
+        elif self.scene == PLAYING:
+            self.handle_playing_event(event)
+        elif event.type == pygame.MOUSEBUTTONDOWN and self.end_button.collidepoint(event.pos):
+            if self.scene == WON:
+                self.running = False
+            else:
+                self.enter_start()  # Restart the game
+
+    def handle_start_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            for difficulty, rectangle in self.buttons.items():
+                if rectangle.collidepoint(event.pos):
+                    self.enter_playing(difficulty)
+                    return
+            for box_length, rectangle in self.size_buttons.items():
+                if rectangle.collidepoint(event.pos):
+                    self.box_length = box_length
+                    if box_length > 3:
+                        self.rules = tuple(rule for rule in self.rules if rule != 'windoku')
+                    self.enter_start()
+                    return
+            for rule, rectangle in self.rule_buttons.items():
+                if rectangle.collidepoint(event.pos) and not (rule == 'windoku' and self.box_length > 3):
+                    chosen = set(self.rules) ^ {rule}
+                    self.rules = tuple(r for r in RULES if r in chosen)
+                    self.enter_start()
+                    return
+
+    def handle_playing_event(self, event):
+        board = self.board
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            clicked_cell = board.click(*event.pos)
+            if clicked_cell:
+                board.select(*clicked_cell)
+
+            # Bottom menu interaction
+            reset_rectangle, restart_rectangle, exit_rectangle, solve_rectangle = self.menu
+            if reset_rectangle.collidepoint(event.pos):
+                board.reset_to_original()
+            elif restart_rectangle.collidepoint(event.pos):
+                self.enter_start()  # Restart the game
+            elif exit_rectangle.collidepoint(event.pos):
+                self.running = False
+            elif solve_rectangle.collidepoint(event.pos):
+                board.solve()
+
+        elif event.type == pygame.KEYDOWN and event.key in HINT_KEYS + PENCIL_KEYS \
+                and not 0 < DIGIT_KEYS.get(event.key, 0) <= board.size:
+            if event.key in HINT_KEYS:
+                self.show_hint(board.hint())
+            else:
+                board.toggle_pencil_marks()
+
+        elif event.type == pygame.KEYDOWN and board.selected_cell:
+            if event.key in DIGIT_KEYS:
+                board.sketch(DIGIT_KEYS[event.key])
+            elif event.key == pygame.K_RETURN:
+                board.place_number(board.selected_cell.sketched_value)
+                if board.is_full() and board.check_board():
+                    self.enter_end(WON, "Game Won!")
+                elif board.is_full():
+                    self.enter_end(LOST, "Game Over :(")
+            elif event.key == pygame.K_BACKSPACE or event.key == pygame.K_DELETE:
+                board.clear()
+            elif event.key in ARROW_KEYS:
+                board.move_selection(ARROW_KEYS[event.key])
+
+    def show_hint(self, move):
+        # The hinted value is sketched into its cell; the caption says why
+        if move is None:
+            pygame.display.set_caption("Sudoku")
+            return
+        row, col, value, technique = move
+        pygame.display.set_caption(f"Sudoku - hint: {SYMBOLS[value - 1]} at row {row + 1}, column {col + 1} "
+                                   f"({technique.replace('_', ' ')})")
+
+    def draw(self):
+        # Only the board changes between events; the other scenes are drawn on entry
+        if self.scene == PLAYING:
+            dirty_rects = self.board.draw()
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+
 # Main Function
 def main():
-    # Set up the board
-    difficulty = draw_game_start()
-    board = Board(WIDTH, HEIGHT - 60, screen, difficulty, LINE_COLOR, FONT)
-    solved = False
+    if len(sys.argv) > 1:
+        # 9x9 games come from the puzzle library file named on the command line
+        pool = PuzzleLibrary(sys.argv[1])
+    else:
+        # Keep puzzles generated in the background so new games start instantly,
+        # graded by the techniques they take to solve like the games Board generates itself
+        pool = PuzzlePool(path=POOL_PATH, graded=True)
+        pool.load()
+        pool.start()
+
+    game = Game(pool)
 
     # Game loop
-    running = True
-    while running:
-        screen.fill(BACKGROUND_COLOR)
+    clock = pygame.time.Clock()
+    while game.running:
+        # Event Handling: sleep until an event arrives, then take everything queued
+        events = [pygame.event.wait()] + pygame.event.get()
+        for event in events:
+            game.handle_event(event)
+            if not game.running:
+                break
 
         # Draw the Board
-        board.draw()
-
-        # Draw Bottom Menu
-        reset_rectangle, restart_rectangle, exit_rectangle, solve_rectangle = bottom_menu()
-
-        # Event Handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                pygame.quit()
-                sys.exit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                pos = pygame.mouse.get_pos()
-                clicked_cell = board.click(*pos)
-                if clicked_cell:
-                    board.select(*clicked_cell)
-
-                # Bottom menu interaction
-                if reset_rectangle.collidepoint(event.pos):
-                    board.reset_to_original()
-                elif restart_rectangle.collidepoint(event.pos):
-                    main()  # Restart the game
-                elif exit_rectangle.collidepoint(event.pos):
-                    pygame.quit()
-                    sys.exit()
-                elif solve_rectangle.collidepoint(event.pos):
-                    board.solve()
-                    solved = True
-
-            if event.type == pygame.KEYDOWN:
-                if board.selected_cell:
-                    if event.key in [pygame.K_1, pygame.K_KP1]:
-                        board.sketch(1)
-                    elif event.key in [pygame.K_2, pygame.K_KP2]:
-                        board.sketch(2)
-                    elif event.key in [pygame.K_3, pygame.K_KP3]:
-                        board.sketch(3)
-                    elif event.key in [pygame.K_4, pygame.K_KP4]:
-                        board.sketch(4)
-                    elif event.key in [pygame.K_5, pygame.K_KP5]:
-                        board.sketch(5)
-                    elif event.key in [pygame.K_6, pygame.K_KP6]:
-                        board.sketch(6)
-                    elif event.key in [pygame.K_7, pygame.K_KP7]:
-                        board.sketch(7)
-                    elif event.key in [pygame.K_8, pygame.K_KP8]:
-                        board.sketch(8)
-                    elif event.key in [pygame.K_9, pygame.K_KP9]:
-                        board.sketch(9)
-                    elif event.key == pygame.K_RETURN:
-                        board.place_number(board.selected_cell.sketched_value)
-                        board.update_board()
-                        if board.is_full() and board.check_board():
-                            button_rect = draw_end_screen("Game Won!")
-                            while True:
-                                for event in pygame.event.get():
-                                    if event.type == pygame.QUIT:
-                                        pygame.quit()
-                                        sys.exit()
-                                    if event.type == pygame.MOUSEBUTTONDOWN:
-                                        if button_rect.collidepoint(event.pos):
-                                            pygame.quit()
-                                            sys.exit()
-                        elif board.is_full():
-                            button_rect = draw_end_screen("Game Over :(")
-                            while True:
-                                for event in pygame.event.get():
-                                    if event.type == pygame.QUIT:
-                                        pygame.quit()
-                                        sys.exit()
-                                    if event.type == pygame.MOUSEBUTTONDOWN:
-                                        if button_rect.collidepoint(event.pos):
-                                            main()
-                    elif event.key == pygame.K_BACKSPACE or event.key == pygame.K_DELETE:
-                        board.clear()
-                    elif event.key == pygame.K_UP:
-                        board.move_selection('up')
-                    elif event.key == pygame.K_DOWN:
-                        board.move_selection('down')
-                    elif event.key == pygame.K_LEFT:
-                        board.move_selection('left')
-                    elif event.key == pygame.K_RIGHT:
-                        board.move_selection('right')
-
-        pygame.display.update()
+        game.draw()
+
+        # Cap the frame rate when events arrive faster than we need to draw them
+        clock.tick(FPS)
+
+    if isinstance(pool, PuzzlePool):
+        pool.stop()
+        pool.save()
+    else:
+        pool.close()
+    pygame.quit()
+    sys.exit()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,154 @@
+import argparse
+import collections
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from sudoku_generator import DIFFICULTY_REMOVED, generate_minimal, generate_puzzle
+from sudoku_grader import generate_graded
+from sudoku_transform import flat_variants
+"""
+Headless batch puzzle generation
+Generates puzzles for each difficulty across a pool of worker processes and
+streams them out as one line per puzzle:
+
+    <difficulty>,<puzzle>,<solution>
+
+where puzzle and solution are the 81 cells read row by row (0 for a blank).
+With --variants K each generated puzzle is followed by K - 1 symmetry transforms
+of it, which cost no search at all. With --graded the difficulty is the grade
+from sudoku_grader (the techniques needed to solve it) instead of a removal count.
+With --minimal every puzzle is minimal: no clue can be removed without the
+puzzle gaining a second solution. Combined with --graded, minimal puzzles are
+drawn until one grades as the difficulty.
+
+Usage:
+python3 sudoku_batch.py --count 10000 --difficulty easy hard --output puzzles.txt
+"""
+
+
+'''
+Flattens a 2D board into a string of digits, row by row
+
+Parameters:
+board is a 2D list of ints
+
+Return: str
+'''
+def board_to_string(board):
+    return "".join(str(value) for row in board for value in row)
+
+
+'''
+Generates one chunk of puzzles
+Each chunk seeds its own random.Random from (seed, difficulty, chunk index), so the
+output does not depend on how many workers there are or which one ran the chunk
+
+Parameters:
+task is a tuple (seed, difficulty, chunk index, number of puzzles, unique, variants, graded, minimal)
+
+Return: list of output lines
+'''
+def generate_chunk(task):
+    seed, difficulty, index, count, unique, variants, graded, minimal = task
+    rng = random.Random(f"{seed}:{difficulty}:{index}")
+    removed = DIFFICULTY_REMOVED[difficulty]
+    digits = bytes.maketrans(bytes(range(10)), b"0123456789")
+    lines = []
+    while len(lines) < count:
+        if graded:
+            puzzle, solution = generate_graded(difficulty, rng, minimal=minimal)
+        elif minimal:
+            puzzle, solution = generate_minimal(9, rng)
+        else:
+            puzzle, solution = generate_puzzle(9, removed, rng, unique)
+        lines.append(f"{difficulty},{board_to_string(puzzle)},{board_to_string(solution)}\n")
+        flat_puzzle = bytes(value for row in puzzle for value in row)
+        flat_solution = bytes(value for row in solution for value in row)
+        extra = min(variants - 1, count - len(lines))
+        for new_puzzle, new_solution in flat_variants(flat_puzzle, flat_solution, extra, rng):
+            lines.append(f"{difficulty},{new_puzzle.translate(digits).decode()},"
+                         f"{new_solution.translate(digits).decode()}\n")
+    return lines
+
+
+'''
+Like executor.map, but keeps at most window tasks in flight
+Results come back in task order, and since tasks is consumed lazily neither the
+input nor the results are ever held in memory all at once
+
+Parameters:
+executor is a concurrent.futures executor
+fn is the function to run on each task
+tasks is an iterable of arguments for fn
+window is the maximum number of submitted but unconsumed tasks
+
+Return: generator of results
+'''
+def ordered_map(executor, fn, tasks, window):
+    pending = collections.deque()
+    for task in tasks:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, task))
+    while pending:
+        yield pending.popleft().result()
+
+
+'''
+Splits the requested work into chunk tasks for generate_chunk
+
+Parameters:
+args is the parsed command line
+
+Return: generator of task tuples
+'''
+def make_tasks(args):
+    for difficulty in args.difficulty:
+        remaining = args.count
+        index = 0
+        while remaining > 0:
+            count = min(args.chunk_size, remaining)
+            yield args.seed, difficulty, index, count, args.unique, args.variants, args.graded, args.minimal
+            remaining -= count
+            index += 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate sudoku puzzles in bulk.")
+    parser.add_argument("--count", type=int, default=100,
+                        help="number of puzzles per difficulty (default: 100)")
+    parser.add_argument("--difficulty", nargs="+", choices=list(DIFFICULTY_REMOVED),
+                        default=list(DIFFICULTY_REMOVED), help="difficulties to generate (default: all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0, help="base random seed (default: 0)")
+    parser.add_argument("--chunk-size", type=int, default=50,
+                        help="puzzles generated per worker task (default: 50)")
+    parser.add_argument("--unique", action=argparse.BooleanOptionalAction, default=True,
+                        help="only emit puzzles with a single solution (default: on)")
+    parser.add_argument("--graded", action="store_true",
+                        help="pick difficulty by the solving techniques needed (implies --unique)")
+    parser.add_argument("--minimal", action="store_true",
+                        help="remove clues until every clue left is needed (implies --unique)")
+    parser.add_argument("--variants", type=int, default=1,
+                        help="puzzles emitted per generated puzzle, the rest by symmetry transforms (default: 1)")
+    parser.add_argument("--output", default="-", help="output file, or - for stdout (default: -)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for lines in ordered_map(executor, generate_chunk, make_tasks(args), 2 * args.workers):
+                out.writelines(lines)
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
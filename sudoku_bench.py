@@ -0,0 +1,267 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import sudoku_solver
+from sudoku_generator import SudokuGenerator, generate_puzzle
+from sudoku_state import BoardState
+"""
+Benchmarks for generation, checking and solving
+Every case runs a fixed number of times on fixed seeds (and solving runs on a
+fixed corpus of well-known hard puzzles), so runs on the same machine are
+comparable. Each operation is timed in several rounds, spread over the case's
+run, and only its best time is kept, since whatever else the machine is doing
+can only make an operation slower. For each case it reports the median, 90th and
+99th percentile of those best times, operations per second, the peak memory one
+operation allocates and the noise: how much slower a typical round was than the
+best one. Results can be saved to a JSON file and a later run compared against
+them, flagging every case whose median got slower than the threshold allows, or
+than twice the noise of either run when that is larger.
+
+Needs no display; the Board class is not used, since Board.check_board only
+asks its BoardState.
+
+Usage:
+python3 sudoku_bench.py --save baseline.json
+python3 sudoku_bench.py --compare baseline.json
+"""
+
+
+# Hard 9x9 puzzles with a single solution each, read row by row with 0 for a blank
+HARD_PUZZLES = (
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400",  # Inkala 2012
+    "100007090030020008009600500005300900010080002600004000300000010040000007007000300",  # AI Escargot
+    "100000002090400050006000700050903000000070000000850040700000600030009080002000001",  # Easter Monster
+    "000000039000001005003050800008090006070002000100400000009080050020000600400700000",  # Golden Nugget
+    "000000012000000003002300400001800005060070800000009000008500000900040500470006000",  # Platinum Blonde
+    "600008940900006100070040000200610000000000200089002000000060005000000030800001600",
+    "000000000000003085001020000000507000004000100090000000500000073002010000000040009",
+    "000000010400000000020000000000050407008000300001090000300400200050100000000806000",  # 17 clues
+)
+
+
+'''
+Turns a string of 81 digits into a 2D board
+
+Parameters:
+text is the board read row by row, 0 for a blank
+
+Return: list[list]
+'''
+def parse_board(text):
+    return [[int(text[row * 9 + col]) for col in range(9)] for row in range(9)]
+
+
+HARD_BOARDS = [parse_board(text) for text in HARD_PUZZLES]
+
+
+def setup_generator(rng):
+    return SudokuGenerator(9, 0, rng)
+
+
+def setup_diagonal(rng):
+    generator = SudokuGenerator(9, 0, rng)
+    generator.fill_diagonal()
+    return generator
+
+
+def setup_filled(rng):
+    generator = SudokuGenerator(9, 50, rng)
+    generator.fill_values()
+    return generator
+
+
+def setup_puzzle_generator(rng):
+    generator = setup_filled(rng)
+    generator.remove_cells(unique=True)
+    return generator
+
+
+def setup_state(rng):
+    return BoardState(generate_puzzle(9, 50, rng)[0])
+
+
+def setup_solved_state(rng):
+    return BoardState(generate_puzzle(9, 0, rng, unique=False)[1])
+
+
+def setup_corpus(rng):
+    return HARD_BOARDS
+
+
+def run_generator_is_valid(generator):
+    for row in range(9):
+        for col in range(9):
+            for num in range(1, 10):
+                generator.is_valid(row, col, num)
+
+
+def run_state_is_valid(state):
+    for row in range(9):
+        for col in range(9):
+            for num in range(1, 10):
+                state.is_valid(row, col, num)
+
+
+def run_check_board(state):
+    for _ in range(1000):
+        state.check_board()
+
+
+def run_solve(boards, engine='propagation'):
+    for board in boards:
+        sudoku_solver.solve(board, engine)
+
+
+def run_count(boards):
+    for board in boards:
+        sudoku_solver.count_solutions(board, 2)
+
+
+# (name, setup, run, items per operation); setup(rng) is not timed and its
+# result is passed to run, which is timed
+CASES = (
+    ('fill_values', setup_generator, lambda g: g.fill_values(), 1),
+    ('fill_remaining', setup_diagonal, lambda g: g.fill_remaining(0, 0), 1),
+    ('remove_cells', setup_filled, lambda g: g.remove_cells(unique=True), 1),
+    ('remove_cells_no_unique', setup_filled, lambda g: g.remove_cells(), 1),
+    ('generator_is_valid', setup_puzzle_generator, run_generator_is_valid, 729),
+    ('state_is_valid', setup_state, run_state_is_valid, 729),
+    ('check_board', setup_solved_state, run_check_board, 1000),
+    ('solve_hard', setup_corpus, run_solve, len(HARD_BOARDS)),
+    ('solve_hard_dlx', setup_corpus, lambda boards: run_solve(boards, 'dlx'), len(HARD_BOARDS)),
+    ('count_hard', setup_corpus, run_count, len(HARD_BOARDS)),
+)
+
+
+'''
+Returns the median, 90th and 99th percentile of a list of timings
+
+Parameters:
+times is a non-empty list of seconds
+
+Return: dict with keys median, p90 and p99
+'''
+def summarize(times):
+    percentiles = statistics.quantiles(times, n=100, method='inclusive') if len(times) > 1 else times * 99
+    return {'median': statistics.median(times), 'p90': percentiles[89], 'p99': percentiles[98]}
+
+
+'''
+Times one case
+
+Parameters:
+case is an entry of CASES
+repeat is the number of timed operations
+seed is the base seed; operation i uses random.Random(f"{seed}:{i}")
+rounds is how many times each operation is timed, keeping the best
+
+Return: dict of results
+'''
+def run_case(case, repeat, seed, rounds=1):
+    name, setup, run, items = case
+    rounds_times = [[] for _ in range(repeat)]
+    for _ in range(rounds):
+        for i in range(repeat):
+            # Every round sets up afresh, since running may change the argument
+            arg = setup(random.Random(f"{seed}:{i}"))
+            start = time.perf_counter()
+            run(arg)
+            rounds_times[i].append(time.perf_counter() - start)
+    times = [min(op_times) for op_times in rounds_times]
+    noise = statistics.median(statistics.median(op_times) / min(op_times) - 1 for op_times in rounds_times)
+
+    # Memory is measured on a separate run, since tracing slows everything down
+    arg = setup(random.Random(f"{seed}:0"))
+    tracemalloc.start()
+    run(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        **summarize(times),
+        'ops_per_sec': repeat / sum(times),
+        'items_per_sec': repeat * items / sum(times),
+        'peak_bytes': peak,
+        'noise': noise,
+        'repeat': repeat,
+        'rounds': rounds,
+    }
+
+
+'''
+Compares results against a saved baseline and prints the differences
+
+Parameters:
+results maps case names to the dicts from run_case
+baseline is a results dict loaded from a file
+threshold is the allowed relative slowdown of the median, e.g. 0.2 for 20%,
+raised for a case to twice the noise measured in either run
+
+Return: list of the names of the cases that regressed
+'''
+def compare(results, baseline, threshold):
+    regressed = []
+    print()
+    print(f"{'case':<24}{'baseline ms':>12}{'now ms':>12}{'change':>10}{'allowed':>10}")
+    for name, result in results.items():
+        old = baseline.get('cases', {}).get(name)
+        if old is None:
+            print(f"{name:<24}{'-':>12}{result['median'] * 1000:>12.3f}{'new':>10}")
+            continue
+        change = result['median'] / old['median'] - 1
+        allowed = max(threshold, 2 * old.get('noise', 0), 2 * result['noise'])
+        flag = ""
+        if change > allowed:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        print(f"{name:<24}{old['median'] * 1000:>12.3f}{result['median'] * 1000:>12.3f}{change:>+10.1%}"
+              f"{allowed:>10.1%}{flag}")
+    return regressed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sudoku generation, checking and solving.")
+    parser.add_argument("--repeat", type=int, default=20, help="timed operations per case (default: 20)")
+    parser.add_argument("--seed", type=int, default=0, help="base random seed (default: 0)")
+    parser.add_argument("--rounds", type=int, default=5,
+                        help="times each operation is run, keeping the best time (default: 5)")
+    parser.add_argument("--only", nargs="+", choices=[case[0] for case in CASES], help="cases to run (default: all)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative median slowdown counted as a regression, at least (default: 0.2)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    print(f"{'case':<24}{'median ms':>12}{'p90 ms':>12}{'p99 ms':>12}{'ops/s':>12}{'items/s':>12}{'peak KiB':>10}"
+          f"{'noise':>8}")
+    for case in CASES:
+        if args.only and case[0] not in args.only:
+            continue
+        result = run_case(case, args.repeat, args.seed, args.rounds)
+        results[case[0]] = result
+        print(f"{case[0]:<24}{result['median'] * 1000:>12.3f}{result['p90'] * 1000:>12.3f}"
+              f"{result['p99'] * 1000:>12.3f}{result['ops_per_sec']:>12.1f}{result['items_per_sec']:>12.1f}"
+              f"{result['peak_bytes'] / 1024:>10.1f}{result['noise']:>8.1%}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({'python': platform.python_version(), 'seed': args.seed, 'cases': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
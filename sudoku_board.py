@@ -0,0 +1,414 @@
+import pygame
+from sudoku_generator import SYMBOLS, generate_puzzle, removed_for_size
+from sudoku_grader import GRADES, generate_graded
+from sudoku_instrument import phase
+from sudoku_state import BoardState
+from sudoku_variants import VariantState, generate_variant, windows
+"""
+Pygame user interface for the game board
+Cell and Board draw the game and turn clicks and key presses into moves on a
+BoardState, which holds the actual game state.
+"""
+
+
+# Text colors for each way a digit can be drawn
+GLYPH_COLORS = {
+    'given': (0, 0, 0),
+    'placed': (0, 33, 165),
+    'sketched': (128, 128, 128),  # Light gray for sketched
+    'conflict': (220, 0, 0),  # Red for values that repeat in a row, column or box
+    'pencil': (110, 110, 110),  # Candidates shown as pencil marks, in a smaller font
+}
+
+# Colors of the variant markings drawn on the board background
+VARIANT_COLORS = {
+    'window': (185, 210, 240),  # Windoku windows
+    'diagonal': (120, 150, 200),
+    'parity': (175, 190, 215),  # Squares for even cells, circles for odd cells
+    'cage': (60, 60, 60),  # Dashed cage outlines and sums
+}
+
+
+'''
+Draws a dashed straight line
+
+Parameters:
+surface is the pygame Surface to draw on
+color is the line color
+start and end are the (x, y) end points
+dash is the length of each dash and of each gap
+
+Return: None
+'''
+def draw_dashed_line(surface, color, start, end, dash=4):
+    (x0, y0), (x1, y1) = start, end
+    length = max(abs(x1 - x0), abs(y1 - y0))
+    for offset in range(0, length, 2 * dash):
+        stop = min(offset + dash, length)
+        pygame.draw.line(surface, color,
+                         (x0 + (x1 - x0) * offset // length, y0 + (y1 - y0) * offset // length),
+                         (x0 + (x1 - x0) * stop // length, y0 + (y1 - y0) * stop // length))
+
+
+'''
+Returns the number of cells removed for a game at the given difficulty
+Unknown difficulties are played as easy
+
+Parameters:
+difficulty is 'easy', 'medium' or 'hard'
+box_length is the side length of one box (3 for a 9x9 board)
+
+Return: int
+'''
+def game_removed_cells(difficulty, box_length=3):
+    return removed_for_size(difficulty, box_length * box_length) + 1
+
+
+'''
+Generates the puzzle for a new game
+9x9 puzzles are generated by grade (sudoku_grader), the same way the game's
+PuzzlePool makes them, so a difficulty means the same whichever one a game
+comes from. The grader only handles 9x9 boards, so other sizes have
+game_removed_cells cells removed instead. Unknown difficulties are played as easy
+
+Parameters:
+difficulty is 'easy', 'medium' or 'hard'
+box_length is the side length of one box (3 for a 9x9 board)
+rng is the random.Random to draw from (defaults to the shared random module)
+instrument is a sudoku_instrument.Instrument to report to, or None
+
+Return: tuple (puzzle, solution) of 2D Python lists
+'''
+def generate_game(difficulty, box_length=3, rng=None, instrument=None):
+    if box_length == 3:
+        return generate_graded(difficulty if difficulty in GRADES else 'easy', rng, instrument=instrument)
+    return generate_puzzle(box_length * box_length, game_removed_cells(difficulty, box_length), rng,
+                           instrument=instrument)
+
+
+class Cell:
+    # A cell is only a view of one slot of the BoardState buffers, so a board of
+    # cells adds little on top of the state itself
+    __slots__ = ('state', 'row', 'col', 'index', 'selected')
+
+    def __init__(self, state, row, col):
+        self.state = state
+        self.row = row
+        self.col = col
+        self.index = state.index(row, col)
+        self.selected = False
+
+    @property
+    def value(self):
+        return self.state.values[self.index]
+
+    @property
+    def sketched_value(self):
+        return self.state.sketches[self.index]
+
+    @property
+    def original_value(self):
+        return self.state.givens[self.index]
+
+    @property
+    def conflict(self):
+        # Whether the value repeats in its row, column or box
+        return self.state.is_conflict(self.row, self.col)
+
+    def set_cell_value(self, value):
+        self.state.place(self.row, self.col, value)
+
+    def set_sketched_value(self, value):
+        self.state.set_sketch(self.row, self.col, value)
+
+    def get_rect(self, cell_size):
+        return pygame.Rect(self.col * cell_size, self.row * cell_size, cell_size, cell_size)
+
+    def draw(self, screen, cell_size, glyphs, background, grid_lines, pencil=False):
+        rect = self.get_rect(cell_size)
+        x, y = rect.x, rect.y
+        value = self.value
+
+        # Draw cell background
+        screen.blit(background, rect, rect)
+
+        # Highlight cell background
+        if self.selected:
+            pygame.draw.rect(screen, (255, 0, 0), rect, max(2, cell_size // 12))  # Red border for selected
+
+        # Draw sketched value
+        if self.sketched_value != 0 and value == 0:
+            text = glyphs['sketched'][self.sketched_value]
+            screen.blit(text, text.get_rect(center=(x + cell_size // 4, y + cell_size // 3)))
+
+        # Draw every candidate in its own spot of a small grid inside the cell
+        elif pencil and value == 0:
+            mask = self.state.cands[self.index]
+            box_length = self.state.box_length
+            step = cell_size / box_length
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                num = bit.bit_length()
+                spot_row, spot_col = divmod(num - 1, box_length)
+                text = glyphs['pencil'][num]
+                screen.blit(text, text.get_rect(center=(x + int((spot_col + 0.5) * step),
+                                                        y + int((spot_row + 0.5) * step))))
+
+        # Draw cell value
+        if value != 0:
+            if self.conflict:
+                style = 'conflict'
+            elif self.original_value != 0:
+                style = 'given'
+            else:
+                style = 'placed'
+            text = glyphs[style][value]
+            screen.blit(text, text.get_rect(center=(x + cell_size // 2, y + cell_size // 2)))
+
+        # Draw the grid lines back over the cell
+        screen.blit(grid_lines, rect, rect)
+        return rect
+
+class Board:
+    def __init__(self, width, height, screen, difficulty, line_color, font, pool=None, box_length=3,
+                 instrument=None, rules=()):
+        self.width = width
+        self.height = height
+        self.screen = screen
+        self.difficulty = difficulty
+        self.line_color = line_color  # Add line color to Board class
+        self.font = font  # Add font to Board class
+        self.board_background_color = (211, 232, 255) #set board color same as in pdf
+        self.box_length = box_length
+        self.size = box_length * box_length  # Number of cells in a row
+        self.instrument = instrument  # Optional sudoku_instrument.Instrument for profiling
+        self.variant = None  # sudoku_variants.Variant when playing with extra rules
+
+        if rules:
+            # Variant rules (sudoku_variants.RULES); the pool only holds classic puzzles
+            puzzle, solution, self.variant = generate_variant(box_length, rules,
+                                                              game_removed_cells(difficulty, box_length),
+                                                              instrument=instrument)
+        elif pool is not None:
+            # Take a ready-made puzzle from a PuzzlePool (which generates one itself
+            # if it has none) or a random one from a PuzzleLibrary file
+            puzzle, solution = pool.take(difficulty)
+        else:
+            puzzle, solution = generate_game(difficulty, box_length, instrument=instrument)
+        # Values, givens, sketches and solution all live here
+        if self.variant is None:
+            self.board = BoardState(puzzle, solution)
+        else:
+            self.board = VariantState(puzzle, solution, self.variant)
+        if instrument is not None:
+            # Every entry, clear and reset goes through set_index, which updates
+            # candidates with candidate_mask; drawing checks is_conflict
+            self.board.instrument = instrument
+            for name in ('set_index', 'is_conflict', 'candidate_mask'):
+                instrument.wrap(self.board, name)
+        self.cells = [[Cell(self.board, i, j) for j in range(self.size)] for i in range(self.size)]
+        self.cell_size = self.width // self.size
+        self.selected_cell = None
+        self.solved = False
+        self.show_pencil = False  # Whether empty cells show all their candidates
+
+        self.build_surfaces()
+        self.dirty = set()  # (row, col) of the cells that need to be redrawn
+        self.full_redraw = True
+
+    def build_surfaces(self):
+        # Render every digit once in each style
+        pencil_font = pygame.font.Font(None, max(8, self.cell_size // self.box_length + 4))
+        self.glyphs = {
+            style: {value: (pencil_font if style == 'pencil' else self.font).render(SYMBOLS[value - 1], True, color)
+                    for value in range(1, self.size + 1)}
+            for style, color in GLYPH_COLORS.items()
+        }
+
+        # Empty board background, and the grid lines on their own transparent layer
+        size = (self.width, self.height)
+        self.background = pygame.Surface(size)
+        self.background.fill(self.board_background_color)
+        self.grid_lines = pygame.Surface(size, pygame.SRCALPHA)
+
+        cell_size = self.cell_size
+        grid_end = cell_size * self.size
+        if self.variant is not None:
+            self.draw_variant()
+
+        # Draw vertical and horizontal lines for the grid
+        for i in range(self.size + 1):  # One more line than cells to cover the edges
+            # Determine line width: thicker lines for box borders
+            line_width = 4 if i % self.box_length == 0 else 1
+
+            # Draw vertical lines
+            pygame.draw.line(self.grid_lines, self.line_color, (i * cell_size, 0), (i * cell_size, grid_end), line_width)
+
+            # Draw horizontal lines
+            pygame.draw.line(self.grid_lines, self.line_color, (0, i * cell_size), (grid_end, i * cell_size), line_width)
+        self.background.blit(self.grid_lines, (0, 0))
+
+    def draw_variant(self):
+        # Windows, diagonals and even/odd marks go on the background; cage outlines
+        # go on the grid line layer so they stay visible over the digits
+        variant, cell_size, n = self.variant, self.cell_size, self.size
+        if variant.windoku:
+            for row, col in windows(self.box_length):
+                rect = (col * cell_size, row * cell_size, self.box_length * cell_size, self.box_length * cell_size)
+                self.background.fill(VARIANT_COLORS['window'], rect)
+        if variant.diagonal:
+            grid_end = cell_size * n
+            pygame.draw.line(self.background, VARIANT_COLORS['diagonal'], (0, 0), (grid_end, grid_end), 2)
+            pygame.draw.line(self.background, VARIANT_COLORS['diagonal'], (grid_end, 0), (0, grid_end), 2)
+        if variant.parity is not None:
+            for index, mark in enumerate(variant.parity):
+                rect = pygame.Rect(0, 0, cell_size * 3 // 4, cell_size * 3 // 4)
+                rect.center = ((index % n) * cell_size + cell_size // 2, (index // n) * cell_size + cell_size // 2)
+                if mark == 'e':
+                    pygame.draw.rect(self.background, VARIANT_COLORS['parity'], rect)
+                elif mark == 'o':
+                    pygame.draw.ellipse(self.background, VARIANT_COLORS['parity'], rect)
+
+        inset = max(2, cell_size // 10)
+        sum_font = pygame.font.Font(None, max(10, cell_size // 3))
+        for total, cells in variant.cages:
+            members = set(cells)
+            for cell in cells:
+                row, col = divmod(cell, n)
+                x0, y0 = col * cell_size, row * cell_size
+                x1, y1 = x0 + cell_size, y0 + cell_size
+                # Each outline side runs to the cell edge where the cage continues
+                left = x0 if col > 0 and cell - 1 in members else x0 + inset
+                right = x1 if col < n - 1 and cell + 1 in members else x1 - inset
+                top = y0 if row > 0 and cell - n in members else y0 + inset
+                bottom = y1 if row < n - 1 and cell + n in members else y1 - inset
+                if top != y0:
+                    draw_dashed_line(self.grid_lines, VARIANT_COLORS['cage'], (left, top), (right, top))
+                if bottom != y1:
+                    draw_dashed_line(self.grid_lines, VARIANT_COLORS['cage'], (left, bottom), (right, bottom))
+                if left != x0:
+                    draw_dashed_line(self.grid_lines, VARIANT_COLORS['cage'], (left, top), (left, bottom))
+                if right != x1:
+                    draw_dashed_line(self.grid_lines, VARIANT_COLORS['cage'], (right, top), (right, bottom))
+            # The sum goes in the top-left corner of the cage's first cell
+            row, col = divmod(cells[0], n)
+            text = sum_font.render(str(total), True, VARIANT_COLORS['cage'])
+            self.background.blit(text, (col * cell_size + inset + 1, row * cell_size + inset + 1))
+
+    def mark_dirty(self, row, col):
+        self.dirty.add((row, col))
+
+    def mark_units_dirty(self, row, col):
+        # A change can add or remove conflicts anywhere in the cell's row, column and box
+        # (and the extra units and cage of a variant)
+        for u in self.board.cell_units[row * self.size + col]:
+            for cell in self.board.units[u]:
+                self.dirty.add(divmod(cell, self.size))
+
+    def draw(self):
+        # Redraws the cells that changed since the last call and returns the
+        # screen areas that were touched, for pygame.display.update
+        if self.full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            self.dirty = {(i, j) for i in range(self.size) for j in range(self.size)}
+
+        rects = []
+        for row, col in self.dirty:
+            cell = self.cells[row][col]
+            rects.append(cell.draw(self.screen, self.cell_size, self.glyphs, self.background, self.grid_lines,
+                                   self.show_pencil))
+        self.dirty.clear()
+
+        if self.full_redraw:
+            self.full_redraw = False
+            return [pygame.Rect(0, 0, self.width, self.height)]
+        return rects
+
+    def select(self, row, col):
+        if self.selected_cell:
+            self.selected_cell.selected = False
+            self.mark_dirty(self.selected_cell.row, self.selected_cell.col)
+        self.selected_cell = self.cells[row][col]
+        self.selected_cell.selected = True
+        self.mark_dirty(row, col)
+
+    def click(self, x, y):
+        if 0 <= x <= self.width and 0 <= y <= self.height:
+            cell_width = self.width // self.size
+            cell_height = self.height // self.size
+            row, col = y // cell_height, x // cell_width
+            if row < self.size and col < self.size:
+                return row, col
+        return None
+
+    def clear(self):
+        # Only allow clearing if the cell is not part of the original puzzle
+        if self.selected_cell and self.board.clear(self.selected_cell.row, self.selected_cell.col):
+            self.mark_units_dirty(self.selected_cell.row, self.selected_cell.col)
+
+    def sketch(self, value):
+        if self.selected_cell and self.selected_cell.value == 0 and 1 <= value <= self.size:
+            self.selected_cell.set_sketched_value(value)
+            self.mark_dirty(self.selected_cell.row, self.selected_cell.col)
+
+    def place_number(self, value):
+        if self.selected_cell and self.board.place(self.selected_cell.row, self.selected_cell.col, value):
+            self.mark_units_dirty(self.selected_cell.row, self.selected_cell.col)
+
+
+    def reset_to_original(self):
+        self.board.reset()
+        self.full_redraw = True
+
+    def is_full(self):
+        return self.board.is_full()
+
+    def find_empty(self):
+        return self.board.find_empty()
+
+    def check_board(self):
+        return self.board.check_board()
+
+    def check_victory(self):
+        if not self.board.check_board():
+            return False
+        self.solved = True
+        return True
+
+    def solve(self):
+        with phase(self.instrument, 'solve'):
+            solved = self.board.solve()
+        if not solved:
+            return
+        self.full_redraw = True
+        self.solved = True
+
+    def toggle_pencil_marks(self):
+        self.show_pencil = not self.show_pencil
+        self.full_redraw = True
+
+    def hint(self):
+        # Selects the cell of the next logical move and sketches its value in,
+        # so Enter accepts it; returns (row, col, value, technique) or None
+        with phase(self.instrument, 'hint'):
+            move = self.board.hint()
+        if move is not None:
+            row, col, value, technique = move
+            self.select(row, col)
+            if technique == 'mistake':
+                self.clear()  # Only empty cells take a sketch
+            self.sketch(value)
+        return move
+
+    def move_selection(self, direction):
+        if self.selected_cell:
+            row, col = self.selected_cell.row, self.selected_cell.col
+            if direction == 'up' and row > 0:
+                self.select(row - 1, col)
+            elif direction == 'down' and row < self.size - 1:
+                self.select(row + 1, col)
+            elif direction == 'left' and col > 0:
+                self.select(row, col - 1)
+            elif direction == 'right' and col < self.size - 1:
+                self.select(row, col + 1)
@@ -0,0 +1,157 @@
+import argparse
+import math
+import sys
+import numpy as np
+"""
+Vectorized checking of many boards at once
+check_grids takes an (N, n, n) array of boards, complete or partial, and finds
+for every board whether any value repeats in a row, column or box, whether every
+cell is filled, and which cells are in conflict. A board passes
+BoardState.check_board exactly when it is both valid and complete here.
+
+Boards are checked in chunks so memory stays bounded for any N and n. This needs NumPy,
+which the game itself does not.
+
+Usage:
+python3 sudoku_check.py puzzles.txt
+"""
+
+
+# Size of the one-hot digit table of one chunk (chunk * n**3 bytes): 65536 9x9
+# boards, or about 3000 25x25 ones
+CHUNK_BYTES = 65536 * 9 ** 3
+
+
+'''
+Returns the box each cell belongs to, numbered row by row
+
+Parameters:
+box_length is the side length of one box
+
+Return: (n, n) int array
+'''
+def box_ids(box_length):
+    n = box_length * box_length
+    rows, cols = np.indices((n, n))
+    return (rows // box_length) * box_length + cols // box_length
+
+
+'''
+Checks one chunk of boards for check_grids
+
+Parameters:
+grids is an (N, n, n) uint8 array
+box_length is the side length of one box
+
+Return: tuple (valid, complete, conflicts) as in check_grids
+'''
+def check_chunk(grids, box_length):
+    count, n, _ = grids.shape
+    filled = grids != 0
+
+    # onehot[k, r, c, d] is whether board k holds d + 1 at (r, c)
+    onehot = grids[..., None] == np.arange(1, n + 1, dtype=np.uint8)
+    row_counts = onehot.sum(axis=2, dtype=np.uint8)  # [k, row, digit]
+    col_counts = onehot.sum(axis=1, dtype=np.uint8)  # [k, col, digit]
+    box_counts = onehot.reshape(count, box_length, box_length, box_length, box_length, n)
+    box_counts = box_counts.sum(axis=(2, 4), dtype=np.uint8).reshape(count, n, n)  # [k, box, digit]
+
+    # How often each cell's own value appears in its row, column and box
+    board = np.arange(count)[:, None, None]
+    rows, cols = np.indices((n, n))
+    digit = np.where(filled, grids.astype(np.intp) - 1, 0)
+    repeated = ((row_counts[board, rows, digit] > 1)
+                | (col_counts[board, cols, digit] > 1)
+                | (box_counts[board, box_ids(box_length), digit] > 1))
+
+    conflicts = repeated & filled
+    valid = ~conflicts.any(axis=(1, 2))
+    complete = filled.all(axis=(1, 2))
+    return valid, complete, conflicts
+
+
+'''
+Checks a batch of boards
+A board is valid when no value repeats in any row, column or box (empty cells
+are ignored) and complete when every cell holds a value
+
+Parameters:
+grids is an array-like of shape (N, n, n) with 0 for the blank cells, n = 4, 9, 16 or 25
+
+Return: tuple (valid, complete, conflicts) of an (N,) bool array, an (N,) bool
+array and an (N, n, n) bool array marking the cells whose value repeats
+'''
+def check_grids(grids):
+    grids = np.asarray(grids)
+    if grids.ndim != 3 or grids.shape[1] != grids.shape[2]:
+        raise ValueError(f"expected an (N, n, n) array of boards, got shape {grids.shape}")
+    n = grids.shape[1]
+    box_length = math.isqrt(n)
+    if box_length * box_length != n:
+        raise ValueError(f"board side {n} is not a square number")
+    if grids.size and (grids.min() < 0 or grids.max() > n):
+        raise ValueError(f"board values must be between 0 and {n}")
+    grids = grids.astype(np.uint8, copy=False)
+
+    valid = np.empty(len(grids), dtype=bool)
+    complete = np.empty(len(grids), dtype=bool)
+    conflicts = np.empty(grids.shape, dtype=bool)
+    chunk_size = max(1, CHUNK_BYTES // n ** 3)
+    for start in range(0, len(grids), chunk_size):
+        end = start + chunk_size
+        valid[start:end], complete[start:end], conflicts[start:end] = check_chunk(grids[start:end], box_length)
+    return valid, complete, conflicts
+
+
+'''
+Parses boards written as strings of digits, one cell per character read row by
+row with 0 (or .) for a blank, as written by sudoku_batch.py
+
+Parameters:
+strings is a list of equal-length strings of 81 digits
+
+Return: (N, 9, 9) uint8 array
+'''
+def grids_from_strings(strings):
+    data = "".join(strings).replace(".", "0").encode("ascii")
+    grids = np.frombuffer(data, dtype=np.uint8) - ord("0")
+    if len(data) != 81 * len(strings) or (grids > 9).any():
+        raise ValueError("boards must be strings of 81 digits")
+    return grids.reshape(len(strings), 9, 9)
+
+
+'''
+Returns the boards in a file: either one board per line, or lines of
+difficulty,puzzle,solution from sudoku_batch.py, in which case the solutions are checked
+
+Parameters:
+f is an open text file
+
+Return: list of str
+'''
+def read_boards(f):
+    return [line.strip().split(",")[-1] for line in f if line.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check sudoku boards in bulk.")
+    parser.add_argument("input", nargs="?", default="-", help="file of boards, or - for stdin (default: -)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.input == "-":
+        boards = read_boards(sys.stdin)
+    else:
+        with open(args.input) as f:
+            boards = read_boards(f)
+    valid, complete, conflicts = check_grids(grids_from_strings(boards))
+    print(f"boards:   {len(boards)}")
+    print(f"valid:    {int(valid.sum())}")
+    print(f"complete: {int(complete.sum())}")
+    print(f"solved:   {int((valid & complete).sum())}")
+
+
+if __name__ == "__main__":
+    main()
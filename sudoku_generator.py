@@ -1,11 +1,57 @@
 import math
 import random
-import pygame
+import sudoku_solver
+from sudoku_instrument import phase
 """
 This was adapted from a GeeksforGeeks article "Program for Sudoku Generator" by Aarti_Rathi and Ankur Trisal
 https://www.geeksforgeeks.org/program-sudoku-generator/
 """
 
+# Number of cells removed for each difficulty level
+DIFFICULTY_REMOVED = {
+    'easy': 30,
+    'medium': 40,
+    'hard': 50,
+}
+
+# On 16x16 and 25x25 boards the 9x9 proportions leave puzzles whose uniqueness
+# checks get very expensive, so those boards remove this share of the cells instead
+LARGE_BOARD_REMOVED = {
+    'easy': 0.35,
+    'medium': 0.45,
+    'hard': 0.5,
+}
+
+# Symbols used to show values, so that 16x16 and 25x25 boards fit one character per cell
+SYMBOLS = "123456789ABCDEFGHIJKLMNOP"
+
+# Default SudokuGenerator.search_budget
+SEARCH_BUDGET = 50
+
+
+_fill_orders = {}
+
+
+'''
+Returns the (cached) cells fill_remaining has to fill, in the order it fills them
+This is every cell outside the diagonal boxes, row by row, as (row, col, box).
+Shared by every generator with the same box size
+
+Parameters:
+box_length is the side length of one box
+
+Return: tuple of tuples
+'''
+def fill_order(box_length):
+    order = _fill_orders.get(box_length)
+    if order is None:
+        row_length = box_length * box_length
+        order = tuple((row, col, (row // box_length) * box_length + col // box_length)
+                      for row in range(row_length) for col in range(row_length)
+                      if row // box_length != col // box_length)
+        _fill_orders[box_length] = order
+    return order
+
 class SudokuGenerator:
     '''
     Create a sudoku board - initialize class variables and set up the 2D board
@@ -18,16 +64,36 @@ class SudokuGenerator:
     Parameters:
     row_length is the number of rows/columns of the board (always 9 for this project)
     removed_cells is an integer value - the number of cells to be removed
+    rng is the random.Random to draw from (defaults to the shared random module)
+    instrument is a sudoku_instrument.Instrument to report to, or None (the default) for none
+
+    row_length may be 4, 9, 16 or 25 (box sizes 2 to 5)
 
     Return:
     None
     '''
-    def __init__(self, row_length, removed_cells):
+    def __init__(self, row_length, removed_cells, rng=None, instrument=None):
         self.row_length = row_length
         self.removed_cells = removed_cells
+        self.rng = rng if rng is not None else random
         self.board = [[0 for _ in range(row_length)] for _ in range(row_length)]
         self.solution_board = None
         self.box_length = int(math.sqrt(row_length))
+        # Bitmasks of the digits used in each row, column and box.
+        # Bit (num - 1) is set when num is present in that unit.
+        self.full_mask = (1 << row_length) - 1
+        self.row_used = [0] * row_length
+        self.col_used = [0] * row_length
+        self.box_used = [0] * row_length
+        # Most guesses a uniqueness check in remove_cells may make before the
+        # removal is given up on (the cell keeps its value)
+        self.search_budget = SEARCH_BUDGET
+        # Untried candidates of each cell in fill_order, made on first use by fill_remaining
+        self.fill_stack = None
+        self.instrument = instrument
+        # Variant rules the uniqueness checks apply on top of the classic ones
+        # (set by sudoku_variants.VariantGenerator)
+        self.variant = None
 
     '''
     Returns a 2D python list of numbers which represents the board
@@ -116,6 +182,76 @@ class SudokuGenerator:
                 self.valid_in_col(col, num) and
                 self.valid_in_box(row - row % self.box_length, col - col % self.box_length, num))
 
+    '''
+    Returns the index of the box containing (row, col)
+    Boxes are numbered left to right, top to bottom
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: int
+    '''
+    def box_index(self, row, col):
+        return (row // self.box_length) * self.box_length + col // self.box_length
+
+    '''
+    Returns a bitmask of the digits that can still be entered at (row, col)
+    Bit (num - 1) is set when num is unused in the cell's row, column and box,
+    so the lookup is a single OR/AND over the unit bitmasks
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: int
+    '''
+    def candidates(self, row, col):
+        return self.full_mask & ~(self.row_used[row] | self.col_used[col] |
+                                  self.box_used[self.box_index(row, col)])
+
+    '''
+    Returns how many digits can still be entered at (row, col)
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: int
+    '''
+    def candidate_count(self, row, col):
+        return self.candidates(row, col).bit_count()
+
+    '''
+    Writes num into (row, col) and marks it as used in the unit bitmasks
+    The cell must be empty and num must be a candidate for it
+
+    Parameters:
+    row and col are the row index and col index of the cell
+    num is the value to enter
+
+    Return: None
+    '''
+    def place(self, row, col, num):
+        bit = 1 << (num - 1)
+        self.board[row][col] = num
+        self.row_used[row] |= bit
+        self.col_used[col] |= bit
+        self.box_used[self.box_index(row, col)] |= bit
+
+    '''
+    Clears (row, col) and releases its value in the unit bitmasks
+    This is the exact inverse of place
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: None
+    '''
+    def unplace(self, row, col):
+        bit = ~(1 << (self.board[row][col] - 1))
+        self.board[row][col] = 0
+        self.row_used[row] &= bit
+        self.col_used[col] &= bit
+        self.box_used[self.box_index(row, col)] &= bit
+
     '''
     Fills the specified 3x3 box with values
     For each position, generates a random digit which has not yet been used in the box
@@ -128,10 +264,10 @@ class SudokuGenerator:
     '''
     def fill_box(self, row_start, col_start):
         nums = list(range(1, self.row_length + 1))
-        random.shuffle(nums)
+        self.rng.shuffle(nums)
         for i in range(self.box_length):
             for j in range(self.box_length):
-                self.board[row_start + i][col_start + j] = nums.pop()
+                self.place(row_start + i, col_start + j, nums.pop())
 
     '''
     Fills the three boxes along the main diagonal of the board
@@ -145,11 +281,14 @@ class SudokuGenerator:
             self.fill_box(i, i)
 
     '''
-    DO NOT CHANGE
-    Provided for students
     Fills the remaining cells of the board
     Should be called after the diagonal boxes have been filled
 
+    Backtracks iteratively over the cells from fill_order, keeping the untried
+    candidates of each cell in a preallocated stack, so there is one Python frame
+    however large the board is. Cells and digits are tried in the same order as
+    the original recursive version, so the same grids come out
+
     Parameters:
     row, col specify the coordinates of the first empty (0) cell
 
@@ -157,46 +296,142 @@ class SudokuGenerator:
     boolean (whether or not we could solve the board)
     '''
     def fill_remaining(self, row, col):
-        if col >= self.row_length and row < self.row_length - 1:
-            row += 1
-            col = 0
-        if row >= self.row_length and col >= self.row_length:
+        order = fill_order(self.box_length)
+        if self.fill_stack is None:
+            self.fill_stack = [0] * len(order)
+        stack = self.fill_stack
+        board = self.board
+        row_used, col_used, box_used = self.row_used, self.col_used, self.box_used
+        full = self.full_mask
+
+        # Skip the cells before (row, col)
+        first = row * self.row_length + col
+        k = 0
+        end = len(order)
+        while k < end and order[k][0] * self.row_length + order[k][1] < first:
+            k += 1
+        start = k
+        if k == end:
             return True
-        if row < self.box_length:
-            if col < self.box_length:
-                col = self.box_length
-        elif row < self.row_length - self.box_length:
-            if col == int(row // self.box_length * self.box_length):
-                col += self.box_length
-        else:
-            if col == self.row_length - self.box_length:
-                row += 1
-                col = 0
-                if row >= self.row_length:
-                    return True
 
-        for num in range(1, self.row_length + 1):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                if self.fill_remaining(row, col + 1):
+        r, c, b = order[k]
+        stack[k] = full & ~(row_used[r] | col_used[c] | box_used[b])
+        backtracks = 0
+        while True:
+            r, c, b = order[k]
+            num = board[r][c]
+            if num:
+                # Coming back from a dead end: take the last digit out again
+                bit = ~(1 << (num - 1))
+                board[r][c] = 0
+                row_used[r] &= bit
+                col_used[c] &= bit
+                box_used[b] &= bit
+
+            free = stack[k]
+            if free:
+                # Digits are tried from the lowest up
+                bit = free & -free
+                stack[k] = free ^ bit
+                board[r][c] = bit.bit_length()
+                row_used[r] |= bit
+                col_used[c] |= bit
+                box_used[b] |= bit
+                k += 1
+                if k == end:
+                    if self.instrument is not None:
+                        self.instrument.count('backtracks', backtracks)
                     return True
-                self.board[row][col] = 0
-        return False
+                r, c, b = order[k]
+                stack[k] = full & ~(row_used[r] | col_used[c] | box_used[b])
+            else:
+                k -= 1
+                backtracks += 1
+                if k < start:
+                    if self.instrument is not None:
+                        self.instrument.count('backtracks', backtracks)
+                    return False
 
     '''
-    DO NOT CHANGE
-    Provided for students
-    Constructs a solution by calling fill_diagonal and fill_remaining
+    Fills the remaining cells of the board with the exact-cover solver
+    An alternative to fill_remaining for boards too large for plain backtracking
+    Should be called after the diagonal boxes have been filled
+
+    Parameters: None
+
+    Return:
+    boolean (whether or not we could solve the board)
+    '''
+    def fill_remaining_exact(self):
+        solution = sudoku_solver.solve(self.board, engine='dlx', instrument=self.instrument)
+        if solution is None:
+            return False
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                if self.board[row][col] == 0:
+                    self.place(row, col, solution[row][col])
+        return True
+
+    '''
+    Empties every cell of the board
+
+    Parameters: None
+    Return: None
+    '''
+    def clear(self):
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                if self.board[row][col]:
+                    self.unplace(row, col)
+
+    '''
+    Fills an empty board with a random solution from the solver's randomised search
+    Unlike fill_diagonal and fill_remaining this cannot start from boxes that
+    have no completion, and it follows the variant rules when there are any
 
     Parameters: None
+
+    Return:
+    boolean (whether or not we could solve the board)
+    '''
+    def fill_random(self):
+        solution = sudoku_solver.random_solution(self.box_length, self.rng, self.variant, self.instrument)
+        if solution is None:
+            return False
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                self.place(row, col, solution[row][col])
+        return True
+
+    '''
+    Constructs a solution by calling fill_diagonal and fill_remaining
+
+    On 4x4 boards the diagonal boxes often cannot be completed at all; when
+    filling the rest fails the board is cleared and filled by fill_random instead
+
+    Parameters:
+    exact selects fill_remaining_exact instead of fill_remaining; by default it is
+    used for boards larger than 9x9, where plain backtracking takes far too long
+
     Return: None
     '''
 
-    def fill_values(self):
-        self.fill_diagonal()
-        filled = self.fill_remaining(0, 0)  # Correct starting point
+    def fill_values(self, exact=None):
+        with phase(self.instrument, 'fill_diagonal'):
+            self.fill_diagonal()
+        if exact is None:
+            exact = self.row_length > 9
+        if exact:
+            with phase(self.instrument, 'fill_remaining_exact'):
+                filled = self.fill_remaining_exact()
+        else:
+            with phase(self.instrument, 'fill_remaining'):
+                filled = self.fill_remaining(0, 0)  # Correct starting point
+        if not filled:
+            self.clear()
+            with phase(self.instrument, 'fill_random'):
+                self.fill_random()
         self.solution_board = [row[:] for row in self.board]
-        print(f"Board filled: {filled}")  # Debugging
 
     '''
     Removes the appropriate number of cells from the board
@@ -207,18 +442,113 @@ class SudokuGenerator:
     NOTE: Be careful not to 'remove' the same cell multiple times
     i.e. if a cell is already 0, it cannot be removed again
 
-    Parameters: None
+    With unique set, a cell is only left blank if the puzzle still has exactly
+    one solution afterwards. Every cell is tried at most once, so fewer than
+    removed_cells cells may be removed if the puzzle cannot lose any more
+
+    Parameters:
+    unique is whether the puzzle must keep a single solution
+
     Return: None
     '''
 
-    def remove_cells(self):
+    def remove_cells(self, unique=False):
+        with phase(self.instrument, 'remove_cells'):
+            if unique:
+                self.remove_cells_unique()
+                return
+            count = self.removed_cells
+            tried = 0
+            while count > 0:
+                row = self.rng.randint(0, self.row_length - 1)
+                col = self.rng.randint(0, self.row_length - 1)
+                tried += 1
+                if self.board[row][col] != 0:
+                    self.unplace(row, col)
+                    count -= 1
+            if self.instrument is not None:
+                self.instrument.count('cells_tried', tried)
+                self.instrument.count('cells_removed', self.removed_cells)
+
+    '''
+    Removes up to removed_cells cells while keeping the solution unique
+    Cells are visited in random order; a removal is undone if the puzzle gains
+    a second solution. The board is unique before each removal, so it is enough
+    to search for a solution that puts a different value in the blanked cell
+
+    Parameters: None
+    Return: None
+    '''
+    def remove_cells_unique(self):
         count = self.removed_cells
-        while count > 0:
-            row = random.randint(0, self.row_length - 1)
-            col = random.randint(0, self.row_length - 1)
-            if self.board[row][col] != 0:
-                self.board[row][col] = 0
+        cells = [(row, col) for row in range(self.row_length) for col in range(self.row_length)]
+        self.rng.shuffle(cells)
+        tried = 0
+        for row, col in cells:
+            if count == 0:
+                break
+            num = self.board[row][col]
+            if num == 0:
+                continue
+            tried += 1
+            self.unplace(row, col)
+            if sudoku_solver.count_solutions(self.board, 1, [(row, col, num)], max_nodes=self.search_budget,
+                                             variant=self.variant, instrument=self.instrument) == 0:
                 count -= 1
+            else:
+                self.place(row, col, num)
+        if self.instrument is not None:
+            self.instrument.count('cells_tried', tried)
+            self.instrument.count('uniqueness_checks', tried)
+            self.instrument.count('cells_removed', self.removed_cells - count)
+
+    '''
+    Removes clues until every clue left is needed, giving a minimal puzzle
+    (typically 22 to 26 clues on a 9x9 board, 24 most often). removed_cells is ignored
+
+    Every clue is tried once, in random order. A clue that cannot go without a
+    second solution appearing can never go later either, since blanking more
+    cells only adds solutions, so one pass leaves a minimal puzzle. The checks
+    are exact (no search budget) and start from the unit bitmasks kept by
+    place/unplace instead of rebuilding candidates from the board. A clue whose
+    cell has no other candidate left is removed without any search
+
+    Parameters: None
+    Return: None
+    '''
+    def remove_cells_minimal(self):
+        n = self.row_length
+        cells = [(row, col) for row in range(n) for col in range(n)]
+        boxes = [self.box_index(row, col) for row, col in cells]
+        order = list(range(n * n))
+        self.rng.shuffle(order)
+        removed = searched = 0
+        for index in order:
+            row, col = cells[index]
+            num = self.board[row][col]
+            if num == 0:
+                continue
+            self.unplace(row, col)
+            bit = 1 << (num - 1)
+            if self.candidates(row, col) & ~bit:
+                board, row_used, col_used, box_used = self.board, self.row_used, self.col_used, self.box_used
+                if self.variant is None:
+                    cands = [1 << (board[r][c] - 1) if board[r][c] else
+                             self.full_mask & ~(row_used[r] | col_used[c] | box_used[b])
+                             for (r, c), b in zip(cells, boxes)]
+                else:
+                    cands = [1 << (board[r][c] - 1) if board[r][c] else self.candidates(r, c) for r, c in cells]
+                cands[index] &= ~bit
+                searched += 1
+                if sudoku_solver.count_candidates(cands, self.box_length, 1, variant=self.variant,
+                                                  instrument=self.instrument) != 0:
+                    self.place(row, col, num)
+                    continue
+            removed += 1
+        if self.instrument is not None:
+            self.instrument.count('cells_tried', n * n)
+            self.instrument.count('uniqueness_checks', searched)
+            self.instrument.count('cells_removed', removed)
 
 '''
 DO NOT CHANGE
@@ -242,224 +572,83 @@ def generate_sudoku(size, removed):
     sudoku.remove_cells()
     return board
 
+'''
+Returns the number of cells to remove for a difficulty on a board of any size
+9x9 boards use DIFFICULTY_REMOVED, 4x4 boards the same proportions and larger
+boards LARGE_BOARD_REMOVED. Unknown difficulties are treated as easy
 
+Parameters:
+difficulty is 'easy', 'medium' or 'hard'
+row_length is the number of rows/columns of the board
 
+Return: int
+'''
+def removed_for_size(difficulty, row_length):
+    if difficulty not in DIFFICULTY_REMOVED:
+        difficulty = 'easy'
+    if row_length == 9:
+        return DIFFICULTY_REMOVED[difficulty]
+    if row_length < 9:
+        share = DIFFICULTY_REMOVED[difficulty] / 81
+    else:
+        share = LARGE_BOARD_REMOVED[difficulty]
+    return round(share * row_length * row_length)
 
-class Cell:
-    def __init__(self, value, row, col, screen, line_color, font):
-        self.value = value
-        self.sketched_value = 0
-        self.row = row
-        self.col = col
-        self.screen = screen  # Ensure screen is passed correctly
-        self.line_color = line_color  # Add line color to Cell class
-        self.font = font  # Add font to Cell class
-        self.selected = False
-        self.cell_background_color = (211, 232, 255)
-        self.original_value = value  # Store the original value
-
-
-    def set_cell_value(self, value):
-        self.value = value
-
-    def set_sketched_value(self, value):
-        self.sketched_value = value
-
-    def draw(self):
-        cell_size = self.screen.get_width() // 9
-        x = self.col * cell_size
-        y = self.row * cell_size
-
-        # Draw cell background
-        pygame.draw.rect(self.screen, self.cell_background_color, (x, y, cell_size, cell_size))
-
-        # Highlight cell background
-        if self.selected:
-            pygame.draw.rect(self.screen, (255, 0, 0), (x, y, cell_size, cell_size), 5)  # Red border for selected
-
-        # Draw sketched value
-        if self.sketched_value != 0 and self.value == 0:
-            text = self.font.render(str(self.sketched_value), True, (128, 128, 128))  # Light gray for sketched
-            text_rect = text.get_rect(center=(x + cell_size // 4, y + cell_size // 3))
-            self.screen.blit(text, text_rect)
-
-        # Draw cell value
-        if self.value != 0:
-            text = self.font.render(str(self.value), True, (0, 0, 0))
-            text_rect = text.get_rect(center=(x + cell_size // 2, y + cell_size // 2))
-            self.screen.blit(text, text_rect)
-
-        # Draw cell border
-        pygame.draw.rect(self.screen, self.line_color, (x, y, cell_size, cell_size), 1)
-
-class Board:
-    def __init__(self, width, height, screen, difficulty, line_color, font):
-        self.width = width
-        self.height = height
-        self.screen = screen
-        self.difficulty = difficulty
-        self.line_color = line_color  # Add line color to Board class
-        self.font = font  # Add font to Board class
-        self.board_background_color = (211, 232, 255) #set board color same as in pdf
-
-        if difficulty == 'easy':
-            removed_cells = 30
-        elif difficulty == 'medium':
-            removed_cells = 40
-        elif difficulty == 'hard':
-            removed_cells = 50
-        else:
-            removed_cells = 30
-
-        # Generate board using SudokuGenerator
-        self.board = SudokuGenerator(9, removed_cells+1)
-        self.board.fill_values()  # Fill the board correctly
-        print("Initial solved board:")
-        self.board.print_board()  # Debugging: Print the solved board
-        self.board.remove_cells()  # Then remove cells based on difficulty
-        self.cells = [
-            [Cell(self.board.get_board()[i][j], i, j, self.screen, self.line_color, self.font) for j in range(9)]
-            for i in range(9)
-        ]
-        self.original_board = [[cell.value for cell in row] for row in self.cells]
-        self.solution = self.board.get_solution()  # 保存正确答案
-        self.selected_cell = None
-        self.solved = False
-
-
-    def draw(self):
-        # Fill the screen with the board background color
-        self.screen.fill(self.board_background_color)
-
-        # Calculate cell size based on board dimensions
-        cell_size = self.width // 9
-
-        # Draw each cell
-        for row in self.cells:
-            for cell in row:
-                cell.draw()
-
-        # Draw vertical and horizontal lines for the grid
-        for i in range(10):  # 10 lines to cover all 9 cells + edges
-            # Determine line width: thicker lines for 3x3 grid borders
-            vertical_line_width = 4 if i % 3 == 0 else 1
-
-            # Draw vertical lines
-            pygame.draw.line(
-                self.screen,
-                self.line_color,
-                (i * cell_size, 0),
-                (i * cell_size, self.height),
-                vertical_line_width
-
-            )
-
-            # Draw horizontal lines
-            horizontal_line_width = 4 if i % 3 == 0 else 1
-            pygame.draw.line(
-                self.screen,
-                self.line_color,
-                (0, i * cell_size),
-                (self.width, i * cell_size),
-                horizontal_line_width
-            )
-
-    def select(self, row, col):
-        if self.selected_cell:
-            self.selected_cell.selected = False
-        self.selected_cell = self.cells[row][col]
-        self.selected_cell.selected = True
-
-    def click(self, x, y):
-        if 0 <= x <= self.width and 0 <= y <= self.height:
-            cell_width = self.width // 9
-            cell_height = self.height // 9
-            return y // cell_height, x // cell_width
-        return None
+'''
+Like generate_sudoku, but also returns the solution and draws from its own RNG
+so that independent workers can produce reproducible streams of puzzles
 
-    def clear(self):
-        if self.selected_cell and self.original_board[self.selected_cell.row][self.selected_cell.col] == 0:
-            # Only allow clearing if the cell is not part of the original puzzle
-            self.selected_cell.set_cell_value(0)
-            self.selected_cell.set_sketched_value(0)
-
-    def sketch(self, value):
-        if self.selected_cell and self.selected_cell.value == 0:
-            self.selected_cell.set_sketched_value(value)
-
-    def place_number(self, value):
-        if self.selected_cell and self.original_board[self.selected_cell.row][self.selected_cell.col] == 0:
-            self.selected_cell.set_cell_value(value)  # Use the passed value
-            self.update_board()
-        #     if self.is_full():
-        #         return self.check_victory()
-        # return None
-
-
-    def reset_to_original(self):
-        for i in range(9):
-            for j in range(9):
-                if self.original_board[i][j] == 0:
-                    self.cells[i][j].set_cell_value(0)
-                    self.cells[i][j].set_sketched_value(0)
-
-    def is_full(self):
-        for row in self.cells:
-            for cell in row:
-                if cell.value == 0:
-                    return False
-        return True
+Parameters:
+size is the number of rows/columns of the board
+removed is the number of cells to clear (set to 0)
+rng is the random.Random to draw from (defaults to the shared random module)
+unique is whether the puzzle must keep a single solution
+instrument is a sudoku_instrument.Instrument to report to, or None
 
-    def update_board(self):
-        for i in range(9):
-            for j in range(9):
-                self.board.board[i][j] = self.cells[i][j].value
-
-
-    def find_empty(self):
-        for i in range(9):
-            for j in range(9):
-                if self.cells[i][j].value == 0:
-                    return i, j
-        return None
-
-    def check_board(self):
-        self.update_board()
-        for i in range(9):
-            for j in range(9):
-                num = self.board.board[i][j]
-                self.board.board[i][j] = 0
-                if not self.board.is_valid(i, j, num):
-                    return False
-                self.board.board[i][j] = num
-        return True
+Return: tuple (puzzle, solution) of 2D Python lists
+'''
+def generate_puzzle(size, removed, rng=None, unique=True, instrument=None):
+    sudoku = SudokuGenerator(size, removed, rng, instrument)
+    sudoku.fill_values()
+    solution = sudoku.get_solution()
+    sudoku.remove_cells(unique)
+    return sudoku.get_board(), solution
 
-    def check_victory(self):
-        self.update_board()
-        for i in range(9):
-            for j in range(9):
-                num = self.board.board[i][j]
-                if not self.board.is_valid(i, j, num):
-                    return False
-        self.solved = True
-        return True
 
-    def solve(self):
-        for i in range(9):
-            for j in range(9):
-                self.cells[i][j].set_cell_value(self.solution[i][j])
-                self.cells[i][j].set_sketched_value(0)
-        self.update_board()
-        self.solved = True
-
-    def move_selection(self, direction):
-        if self.selected_cell:
-            row, col = self.selected_cell.row, self.selected_cell.col
-            if direction == 'up' and row > 0:
-                self.select(row - 1, col)
-            elif direction == 'down' and row < 8:
-                self.select(row + 1, col)
-            elif direction == 'left' and col > 0:
-                self.select(row, col - 1)
-            elif direction == 'right' and col < 8:
-                self.select(row, col + 1)
+'''
+Generates a minimal puzzle: unique, and losing any one clue would give it a
+second solution (see SudokuGenerator.remove_cells_minimal)
+This takes a few tens of milliseconds on 9x9 boards; on 16x16 boards the exact
+uniqueness checks can take minutes
+
+Parameters:
+size is the number of rows/columns of the board
+rng is the random.Random to draw from (defaults to the shared random module)
+instrument is a sudoku_instrument.Instrument to report to, or None
+
+Return: tuple (puzzle, solution) of 2D Python lists
+'''
+def generate_minimal(size, rng=None, instrument=None):
+    sudoku = SudokuGenerator(size, 0, rng, instrument)
+    sudoku.fill_values()
+    solution = sudoku.get_solution()
+    with phase(instrument, 'remove_cells'):
+        sudoku.remove_cells_minimal()
+    return sudoku.get_board(), solution
+
+
+'''
+Cell and Board used to live in this module. They need pygame, so they were moved
+to sudoku_board and are only imported from there when asked for, keeping this
+module free of any pygame import
+
+Parameters:
+name is the attribute being looked up
+
+Return: the requested class
+'''
+def __getattr__(name):
+    if name in ('Cell', 'Board'):
+        import sudoku_board
+        return getattr(sudoku_board, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,519 @@
+import math
+import random
+import sudoku_solver
+from sudoku_generator import DIFFICULTY_REMOVED, generate_minimal, generate_puzzle
+from sudoku_instrument import phase
+"""
+Difficulty grading by the techniques a person needs
+The grader solves a puzzle the way a player would, always using the easiest
+technique that still makes progress, and reports the hardest technique it needed
+and a score adding up the weight of every step. A puzzle these techniques cannot
+finish needs guessing and is graded hard.
+
+Candidates are digit bitmasks per cell (bit num - 1 set when num is still
+possible), updated incrementally as cells are filled and candidates eliminated.
+"""
+
+
+# (name, weight, grade) for each technique, easiest first
+TECHNIQUES = (
+    ('hidden_single', 1, 'easy'),
+    ('naked_single', 2, 'easy'),
+    ('pointing', 5, 'medium'),
+    ('claiming', 5, 'medium'),
+    ('naked_pair', 6, 'medium'),
+    ('hidden_pair', 8, 'medium'),
+    ('x_wing', 15, 'hard'),
+)
+
+# Reported when the techniques above run out before the puzzle is solved
+GUESS = ('guess', 50, 'hard')
+
+GRADES = ('easy', 'medium', 'hard')
+
+# Cells removed before grading when generating for each grade. Past about 45
+# blanks the grade barely depends on the count: at any count up to 64 only about
+# one puzzle in six grades medium, so generate_graded keeps removing cells one at
+# a time from here until the puzzle reaches its grade
+GRADE_REMOVED = {
+    'easy': DIFFICULTY_REMOVED['easy'],
+    'medium': 45,
+    'hard': 55,
+}
+
+
+_geometries = {}
+
+
+'''
+Returns the (cached) unit layout used by the grader
+
+Parameters:
+box_length is the side length of one box
+
+Return: tuple (rows, cols, boxes, units, peers, cell_box)
+'''
+def geometry(box_length):
+    cached = _geometries.get(box_length)
+    if cached is None:
+        n = box_length * box_length
+        units = sudoku_solver.sudoku_units(box_length)
+        rows, cols, boxes = units[:n], units[n:2 * n], units[2 * n:]
+        peers = [set() for _ in range(n * n)]
+        for unit in units:
+            for cell in unit:
+                peers[cell].update(unit)
+        peers = [tuple(p - {cell}) for cell, p in enumerate(peers)]
+        cell_box = [0] * (n * n)
+        for b, box in enumerate(boxes):
+            for cell in box:
+                cell_box[cell] = b
+        cached = (rows, cols, boxes, units, peers, cell_box)
+        _geometries[box_length] = cached
+    return cached
+
+
+'''
+Returns the digits that are candidates in exactly two of the given cells
+
+Parameters:
+cands is the candidate bitmask of every cell
+cells is an iterable of flat cell indices
+
+Return: int digit bitmask
+'''
+def digits_in_two(cands, cells):
+    once = more = most = 0
+    for cell in cells:
+        mask = cands[cell]
+        most |= more & mask
+        more |= once & mask
+        once |= mask
+    return more & ~most
+
+
+class Grader:
+    '''
+    Sets up the candidates for a puzzle
+
+    Parameters:
+    puzzle is a 2D list of ints with 0 for the blank cells
+    cands is the candidate bitmask of every cell (0 for filled cells) when the
+    caller already keeps them, as BoardState does, or None to work them out
+
+    Return:
+    None
+    '''
+    def __init__(self, puzzle, cands=None):
+        self.row_length = len(puzzle)
+        self.box_length = math.isqrt(self.row_length)
+        (self.rows, self.cols, self.boxes, self.units,
+         self.peers, self.cell_box) = geometry(self.box_length)
+        self.values = [value for row in puzzle for value in row]
+        self.steps = {}      # technique name -> number of times it was used
+        if cands is not None:
+            self.cands = list(cands)
+            self.empty = self.values.count(0)
+            self.broken = any(not self.values[cell] and not mask for cell, mask in enumerate(self.cands))
+            return
+        self.cands = [(1 << self.row_length) - 1] * len(self.values)
+        self.empty = len(self.values)
+        self.broken = False  # Set when some empty cell is left without candidates
+        for cell, num in enumerate(self.values):
+            if num:
+                self.place(cell, num)
+
+    '''
+    Fills cell with num and removes num from the candidates of its peers
+
+    Parameters:
+    cell is the flat index of the cell
+    num is the value
+
+    Return: None
+    '''
+    def place(self, cell, num):
+        self.values[cell] = num
+        self.cands[cell] = 0
+        self.empty -= 1
+        clear = ~(1 << (num - 1))
+        cands = self.cands
+        for peer in self.peers[cell]:
+            if cands[peer]:
+                cands[peer] &= clear
+                if cands[peer] == 0:
+                    self.broken = True
+
+    '''
+    Removes the digits in mask from the candidates of cell
+
+    Parameters:
+    cell is the flat index of the cell
+    mask is a digit bitmask
+
+    Return: boolean (whether anything was removed)
+    '''
+    def eliminate(self, cell, mask):
+        if self.cands[cell] & mask:
+            self.cands[cell] &= ~mask
+            if self.cands[cell] == 0 and self.values[cell] == 0:
+                self.broken = True
+            return True
+        return False
+
+    '''
+    Fills every cell that is the only place for a digit in one of its units
+
+    Parameters: None
+    Return: int (number of cells filled)
+    '''
+    def hidden_single(self):
+        found = 0
+        cands = self.cands
+        for unit in self.units:
+            once = more = 0
+            for cell in unit:
+                more |= once & cands[cell]
+                once |= cands[cell]
+            singles = once & ~more
+            while singles:
+                bit = singles & -singles
+                singles ^= bit
+                for cell in unit:
+                    if cands[cell] & bit:
+                        self.place(cell, bit.bit_length())
+                        found += 1
+                        break
+        return found
+
+    '''
+    Fills every cell that has a single candidate left
+
+    Parameters: None
+    Return: int (number of cells filled)
+    '''
+    def naked_single(self):
+        found = 0
+        cands = self.cands
+        for cell, mask in enumerate(cands):
+            if mask and mask & (mask - 1) == 0:
+                self.place(cell, mask.bit_length())
+                found += 1
+        return found
+
+    '''
+    When a digit's candidates in a box all lie in one row or column, removes the
+    digit from the rest of that row or column
+
+    Parameters: None
+    Return: int (number of eliminations made)
+    '''
+    def pointing(self):
+        found = 0
+        n = self.row_length
+        b = self.box_length
+        cands = self.cands
+        for box_index, box in enumerate(self.boxes):
+            # The digits in each row and column of the box, and those in two or more of its cells
+            row_masks = [0] * b
+            col_masks = [0] * b
+            once = more = 0
+            for cell in box:
+                mask = cands[cell]
+                more |= once & mask
+                once |= mask
+                row_masks[cell // n % b] |= mask
+                col_masks[cell % b] |= mask
+            for masks, units, first in ((row_masks, self.rows, box[0] // n), (col_masks, self.cols, box[0] % n)):
+                for i, mask in enumerate(masks):
+                    only = mask & more
+                    for j, other in enumerate(masks):
+                        if j != i:
+                            only &= ~other
+                    while only:
+                        bit = only & -only
+                        only ^= bit
+                        for cell in units[first + i]:
+                            if cands[cell] & bit and self.cell_box[cell] != box_index:
+                                self.eliminate(cell, bit)
+                                found += 1
+        return found
+
+    '''
+    When a digit's candidates in a row or column all lie in one box, removes the
+    digit from the rest of that box
+
+    Parameters: None
+    Return: int (number of eliminations made)
+    '''
+    def claiming(self):
+        found = 0
+        cands = self.cands
+        cell_box = self.cell_box
+        for unit in self.rows + self.cols:
+            # The digits in each box the line crosses, and those in two or more of its cells
+            masks = {}
+            once = more = 0
+            for cell in unit:
+                mask = cands[cell]
+                more |= once & mask
+                once |= mask
+                masks[cell_box[cell]] = masks.get(cell_box[cell], 0) | mask
+            for box_index, mask in masks.items():
+                only = mask & more
+                for other_box, other in masks.items():
+                    if other_box != box_index:
+                        only &= ~other
+                while only:
+                    bit = only & -only
+                    only ^= bit
+                    for cell in self.boxes[box_index]:
+                        if cands[cell] & bit and cell not in unit:
+                            self.eliminate(cell, bit)
+                            found += 1
+        return found
+
+    '''
+    When two cells of a unit have the same two candidates, removes those two
+    digits from the other cells of the unit
+
+    Parameters: None
+    Return: int (number of eliminations made)
+    '''
+    def naked_pair(self):
+        found = 0
+        for unit in self.units:
+            seen = {}
+            for cell in unit:
+                mask = self.cands[cell]
+                if mask.bit_count() == 2:
+                    if mask in seen:
+                        for other in unit:
+                            if other != cell and other != seen[mask] and self.eliminate(other, mask):
+                                found += 1
+                    else:
+                        seen[mask] = cell
+        return found
+
+    '''
+    When two digits can only go in the same two cells of a unit, removes every
+    other candidate from those two cells
+
+    Parameters: None
+    Return: int (number of eliminations made)
+    '''
+    def hidden_pair(self):
+        found = 0
+        n = self.row_length
+        for unit in self.units:
+            seen = {}
+            pairs = digits_in_two(self.cands, unit)
+            for num in range(1, n + 1):
+                bit = 1 << (num - 1)
+                if not pairs & bit:
+                    continue
+                places = tuple(cell for cell in unit if self.cands[cell] & bit)
+                if places in seen:
+                    keep = bit | seen[places]
+                    for cell in places:
+                        if self.eliminate(cell, ~keep & ((1 << n) - 1)):
+                            found += 1
+                            # Later digits may be down to two places now
+                            pairs = digits_in_two(self.cands, unit)
+                else:
+                    seen[places] = bit
+        return found
+
+    '''
+    When a digit can only go in the same two columns of two rows, removes it from
+    those columns in every other row (and the same with rows and columns swapped)
+
+    Parameters: None
+    Return: int (number of eliminations made)
+    '''
+    def x_wing(self):
+        found = 0
+        n = self.row_length
+        for lines, crossing in ((self.rows, self.cols), (self.cols, self.rows)):
+            pairs = [digits_in_two(self.cands, line) for line in lines]
+            for num in range(1, n + 1):
+                bit = 1 << (num - 1)
+                seen = {}
+                eliminated = False  # pairs is out of date for num once it is removed anywhere
+                for index, line in enumerate(lines):
+                    if not eliminated and not pairs[index] & bit:
+                        continue
+                    places = tuple(i for i, cell in enumerate(line) if self.cands[cell] & bit)
+                    if len(places) != 2:
+                        continue
+                    if places in seen:
+                        wing = (lines[seen[places]], line)
+                        for i in places:
+                            for cell in crossing[i]:
+                                if cell not in wing[0] and cell not in wing[1] and self.eliminate(cell, bit):
+                                    found += 1
+                                    eliminated = True
+                    else:
+                        seen[places] = index
+        return found
+
+    '''
+    Returns a cell that can be filled by a naked or hidden single, without filling it
+
+    Parameters: None
+    Return: tuple (cell, num, technique name), or None if there is no single
+    '''
+    def find_single(self):
+        cands = self.cands
+        for unit in self.units:
+            once = more = 0
+            for cell in unit:
+                more |= once & cands[cell]
+                once |= cands[cell]
+            singles = once & ~more
+            if singles:
+                bit = singles & -singles
+                for cell in unit:
+                    if cands[cell] & bit:
+                        return cell, bit.bit_length(), 'hidden_single'
+        for cell, mask in enumerate(cands):
+            if mask and mask & (mask - 1) == 0:
+                return cell, mask.bit_length(), 'naked_single'
+        return None
+
+    '''
+    Finds the next cell a player could fill, applying elimination techniques
+    (easiest first) until a single appears. The technique reported is the hardest
+    one the deduction needed
+
+    Parameters:
+    max_passes bounds the work done: after that many runs of the elimination
+    techniques without a single turning up the move is a guess (0 means no limit)
+
+    Return: tuple (cell, num, technique name), or None if the board is full. When
+    the techniques run out the technique is 'guess' and num is the smallest candidate
+    of the cell with the fewest candidates
+    '''
+    def next_move(self, max_passes=0):
+        if self.empty == 0:
+            return None
+        hardest = None
+        passes = 0
+        while not self.broken:
+            single = self.find_single()
+            if single is not None:
+                cell, num, name = single
+                return cell, num, hardest[0] if hardest is not None else name
+            if max_passes and passes >= max_passes:
+                break
+            for technique in TECHNIQUES[2:]:
+                passes += 1
+                if getattr(self, technique[0])():
+                    if hardest is None or TECHNIQUES.index(technique) > TECHNIQUES.index(hardest):
+                        hardest = technique
+                    break
+                if max_passes and passes >= max_passes:
+                    break
+            else:
+                break
+        open_cells = [cell for cell in range(len(self.values)) if self.values[cell] == 0 and self.cands[cell]]
+        if not open_cells:
+            return None
+        cell = min(open_cells, key=lambda cell: self.cands[cell].bit_count())
+        mask = self.cands[cell]
+        return cell, (mask & -mask).bit_length(), GUESS[0]
+
+    '''
+    Solves as far as the techniques allow, always using the easiest one that
+    makes progress
+
+    Parameters: None
+    Return: tuple (grade, hardest technique name, score)
+    '''
+    def grade(self):
+        hardest = None
+        score = 0
+        while self.empty and not self.broken:
+            for technique in TECHNIQUES:
+                name, weight, _ = technique
+                found = getattr(self, name)()
+                if found:
+                    self.steps[name] = self.steps.get(name, 0) + found
+                    score += weight * found
+                    if hardest is None or TECHNIQUES.index(technique) > TECHNIQUES.index(hardest):
+                        hardest = technique
+                    break
+            else:
+                hardest = GUESS
+                score += GUESS[1]
+                break
+        if self.broken:
+            hardest = GUESS
+        if hardest is None:
+            hardest = TECHNIQUES[0]
+        return hardest[2], hardest[0], score
+
+
+'''
+Grades a puzzle by the techniques needed to solve it
+
+Parameters:
+puzzle is a 2D list of ints with 0 for the blank cells
+
+Return: tuple (grade, hardest technique name, score)
+'''
+def grade_puzzle(puzzle):
+    return Grader(puzzle).grade()
+
+
+'''
+Generates a puzzle that grades as difficulty
+Each attempt generates a unique puzzle with removed cells cleared. If that grades
+easier than difficulty, the remaining clues are tried in random order: one is
+cleared if the puzzle stays unique and does not grade harder than difficulty,
+until the puzzle grades as difficulty or no clue can go. One attempt in three
+or so ends on a medium puzzle, and nearly every other one on a hard or easy
+puzzle as wanted
+
+Parameters:
+difficulty is 'easy', 'medium' or 'hard'
+rng is the random.Random to draw from (defaults to the shared random module)
+attempts is the most puzzles to generate
+removed is the number of cells to remove first, defaulting to GRADE_REMOVED[difficulty]
+minimal is whether to generate minimal puzzles instead (removed is then ignored
+and clues are never cleared afterwards, so only about one minimal puzzle in
+seven grades medium)
+instrument is a sudoku_instrument.Instrument to report to, or None; grading and
+clearing the further clues are timed as the 'grade' phase
+
+Return: tuple (puzzle, solution) of 2D Python lists
+Raises RuntimeError if no puzzle of that grade turns up within attempts tries
+'''
+def generate_graded(difficulty, rng=None, attempts=100, removed=None, minimal=False, instrument=None):
+    rng = rng if rng is not None else random
+    target = GRADES.index(difficulty)
+    if removed is None:
+        removed = GRADE_REMOVED[difficulty]
+    for _ in range(attempts):
+        if minimal:
+            puzzle, solution = generate_minimal(9, rng, instrument)
+        else:
+            puzzle, solution = generate_puzzle(9, removed, rng, instrument=instrument)
+        with phase(instrument, 'grade'):
+            grade = GRADES.index(grade_puzzle(puzzle)[0])
+            if grade < target and not minimal:
+                clues = [(row, col) for row in range(9) for col in range(9) if puzzle[row][col]]
+                rng.shuffle(clues)
+                for row, col in clues:
+                    puzzle[row][col] = 0
+                    if sudoku_solver.count_solutions(puzzle, 2, instrument=instrument) != 1:
+                        puzzle[row][col] = solution[row][col]
+                        continue
+                    grade = GRADES.index(grade_puzzle(puzzle)[0])
+                    if grade > target:
+                        puzzle[row][col] = solution[row][col]
+                    elif grade == target:
+                        break
+        if grade == target:
+            return puzzle, solution
+    raise RuntimeError(f"no {difficulty} puzzle turned up in {attempts} attempts")
@@ -0,0 +1,131 @@
+import collections
+import contextlib
+import functools
+import time
+"""
+Opt-in instrumentation for generation and solving
+An Instrument collects counters (backtracks, solver search states, cells tried
+while removing, ...) and the time spent in each phase, and emits them as
+structured records: dicts passed to a callback, or kept in a list when there is
+none.
+
+Nothing is measured unless an Instrument is handed to the code being profiled.
+Without one the generator and the solver only keep a few local counts they
+already have at hand, and methods are only wrapped for counting on objects
+passed to wrap().
+
+Usage:
+instrument = Instrument(callback=print)
+generate_puzzle(9, 40, instrument=instrument)
+instrument.flush()
+"""
+
+
+class Instrument:
+    '''
+    Sets up empty counters and phase timings
+
+    Parameters:
+    callback is called with every record, or None to keep the records in self.records
+
+    Return:
+    None
+    '''
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.records = []
+        self.counters = collections.Counter()
+        self.phases = collections.defaultdict(float)  # phase name -> total seconds
+
+    '''
+    Emits one record
+
+    Parameters:
+    record is a dict with at least an 'event' key
+
+    Return: None
+    '''
+    def emit(self, record):
+        if self.callback is not None:
+            self.callback(record)
+        else:
+            self.records.append(record)
+
+    '''
+    Adds to a counter
+
+    Parameters:
+    name is the counter name
+    amount is the number to add
+
+    Return: None
+    '''
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    '''
+    Times the code in a with block as one run of a phase and emits a phase record
+
+    Parameters:
+    name is the phase name
+
+    Return: context manager
+    '''
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.phases[name] += seconds
+            self.emit({'event': 'phase', 'name': name, 'seconds': seconds})
+
+    '''
+    Replaces a method of one object with a wrapper that counts its calls
+    Only that object is affected, and only for as long as it lives
+
+    Parameters:
+    obj is the object, e.g. a SudokuGenerator or BoardState
+    name is the method name, e.g. 'set_index'
+    counter is the counter to add to, defaulting to name + '_calls'
+
+    Return: None
+    '''
+    def wrap(self, obj, name, counter=None):
+        method = getattr(obj, name)
+        counter = counter or name + '_calls'
+        counters = self.counters
+
+        @functools.wraps(method)
+        def counted(*args, **kwargs):
+            counters[counter] += 1
+            return method(*args, **kwargs)
+        setattr(obj, name, counted)
+
+    '''
+    Emits the counters and phase totals collected so far as one summary record
+
+    Parameters: None
+    Return: dict (the record)
+    '''
+    def flush(self):
+        record = {'event': 'summary', 'counters': dict(self.counters), 'phases': dict(self.phases)}
+        self.emit(record)
+        return record
+
+
+'''
+Returns instrument.phase(name), or a context manager that does nothing when
+instrument is None, so callers need no branches of their own
+
+Parameters:
+instrument is an Instrument or None
+name is the phase name
+
+Return: context manager
+'''
+def phase(instrument, name):
+    if instrument is None:
+        return contextlib.nullcontext()
+    return instrument.phase(name)
@@ -0,0 +1,318 @@
+import argparse
+import mmap
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+from sudoku_generator import DIFFICULTY_REMOVED, generate_puzzle
+"""
+On-disk puzzle library
+A library file holds any number of 9x9 puzzles in fixed-size records, grouped by
+difficulty, behind a one-page header that says where each difficulty's records
+start and how many there are. Files are read through mmap, so opening a library
+parses only the header and loading a puzzle touches the single page its record
+lives on; nothing else of the file is read.
+
+A library built with --grade files every puzzle under its grade, so a difficulty
+means what it means for the game's own puzzles (sudoku_grader); otherwise puzzles
+keep the difficulty sudoku_batch.py gave them, a number of removed cells. The
+header records which, and a difficulty the library has no puzzles for is
+generated the same way.
+
+Layout (all integers little-endian):
+
+    header, HEADER_SIZE bytes:
+        magic b"SUDOKLIB", version, record size, difficulty count, graded (0 or 1)
+        per difficulty: name (16 bytes), first record, record count
+    records, RECORD_SIZE bytes each (RECORD_SIZE divides the page size, so no
+    record straddles two pages):
+        givens and solution, two cells per byte (4 bits each, 0 for a blank)
+        difficulty index, grade index (255 if not graded), padding
+
+Usage:
+python3 sudoku_batch.py --count 100000 --output puzzles.txt
+python3 sudoku_library.py build puzzles.txt puzzles.sdk
+python3 sudoku_library.py info puzzles.sdk
+"""
+
+
+MAGIC = b"SUDOKLIB"
+VERSION = 3
+HEADER_SIZE = 4096
+RECORD_SIZE = 128
+CELLS = 81
+PACKED_SIZE = (CELLS + 1) // 2
+
+HEADER = struct.Struct("<8sHHHH")
+INDEX_ENTRY = struct.Struct("<16sQQ")
+RECORD = struct.Struct(f"<{PACKED_SIZE}s{PACKED_SIZE}sBB")
+
+# Grade stored for puzzles that were not graded
+UNGRADED = 255
+GRADES = ('easy', 'medium', 'hard')
+
+
+'''
+Packs a 9x9 board two cells per byte
+
+Parameters:
+board is a 2D list of ints from 0 to 9
+
+Return: bytes of length PACKED_SIZE
+'''
+def pack_board(board):
+    cells = [value for row in board for value in row] + [0]
+    return bytes((cells[i] << 4) | cells[i + 1] for i in range(0, CELLS, 2))
+
+
+'''
+Unpacks a board written by pack_board
+
+Parameters:
+data is bytes of length PACKED_SIZE
+
+Return: list[list]
+'''
+def unpack_board(data):
+    cells = []
+    for byte in data:
+        cells.append(byte >> 4)
+        cells.append(byte & 15)
+    return [cells[row * 9:row * 9 + 9] for row in range(9)]
+
+
+'''
+Writes a library file
+Records are first spooled to one temporary file per difficulty, so any number
+of puzzles can be written without holding them in memory
+
+Parameters:
+path is the file to write
+entries is an iterable of tuples (difficulty, puzzle, solution, grade), where
+grade is one of GRADES or None
+difficulties is the order of the difficulties in the index (defaults to easy, medium, hard)
+graded is whether the entries are filed under their grades (see read_batch_lines)
+
+Return: dict mapping difficulty to the number of puzzles written
+'''
+def write_library(path, entries, difficulties=None, graded=False):
+    difficulties = list(difficulties or DIFFICULTY_REMOVED)
+    spools = {difficulty: tempfile.TemporaryFile() for difficulty in difficulties}
+    counts = dict.fromkeys(difficulties, 0)
+    padding = bytes(RECORD_SIZE - RECORD.size)
+    try:
+        for difficulty, puzzle, solution, grade in entries:
+            if difficulty not in spools:
+                raise ValueError(f"unknown difficulty {difficulty!r}")
+            grade_index = GRADES.index(grade) if grade is not None else UNGRADED
+            spools[difficulty].write(RECORD.pack(pack_board(puzzle), pack_board(solution),
+                                                 difficulties.index(difficulty), grade_index) + padding)
+            counts[difficulty] += 1
+
+        header = HEADER.pack(MAGIC, VERSION, RECORD_SIZE, len(difficulties), graded)
+        start = 0
+        for difficulty in difficulties:
+            header += INDEX_ENTRY.pack(difficulty.encode(), start, counts[difficulty])
+            start += counts[difficulty]
+        if len(header) > HEADER_SIZE:
+            raise ValueError("too many difficulties for the header")
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            for difficulty in difficulties:
+                spools[difficulty].seek(0)
+                shutil.copyfileobj(spools[difficulty], f)
+        os.replace(tmp_path, path)
+    finally:
+        for spool in spools.values():
+            spool.close()
+    return counts
+
+
+class PuzzleLibrary:
+    '''
+    Opens a library file and reads its header
+
+    Parameters:
+    path is the library file
+
+    Return:
+    None
+    '''
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count, graded = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self.mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} puzzle library")
+        self.graded = bool(graded)  # Whether puzzles are filed under their grades
+        self.index = {}  # difficulty -> (first record, record count)
+        self.difficulties = []
+        for i in range(count):
+            name, start, size = INDEX_ENTRY.unpack_from(self.mm, HEADER.size + i * INDEX_ENTRY.size)
+            name = name.rstrip(b"\0").decode()
+            self.index[name] = (start, size)
+            self.difficulties.append(name)
+        self.rng = random.Random()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.mm.close()
+
+    '''
+    Returns the number of puzzles of a difficulty, or of all difficulties
+
+    Parameters:
+    difficulty is a difficulty name, or None for the whole library
+
+    Return: int
+    '''
+    def count(self, difficulty=None):
+        if difficulty is None:
+            return sum(size for _, size in self.index.values())
+        return self.index.get(difficulty, (0, 0))[1]
+
+    '''
+    Reads one record
+
+    Parameters:
+    record is the record number in the file
+
+    Return: tuple (difficulty, puzzle, solution, grade or None)
+    '''
+    def read(self, record):
+        offset = HEADER_SIZE + record * RECORD_SIZE
+        puzzle, solution, difficulty, grade = RECORD.unpack(self.mm[offset:offset + RECORD.size])
+        return (self.difficulties[difficulty], unpack_board(puzzle), unpack_board(solution),
+                GRADES[grade] if grade != UNGRADED else None)
+
+    '''
+    Returns the i-th puzzle of a difficulty
+
+    Parameters:
+    difficulty is a difficulty name
+    i is the position among that difficulty's puzzles
+
+    Return: tuple (difficulty, puzzle, solution, grade or None)
+    '''
+    def get(self, difficulty, i):
+        start, size = self.index.get(difficulty, (0, 0))
+        if not 0 <= i < size:
+            raise IndexError(f"no puzzle {i} for difficulty {difficulty!r}")
+        return self.read(start + i)
+
+    '''
+    Returns a random puzzle of a difficulty
+
+    Parameters:
+    difficulty is a difficulty name
+    rng is the random.Random to draw from (defaults to the library's own)
+
+    Return: tuple (difficulty, puzzle, solution, grade or None)
+    '''
+    def random(self, difficulty, rng=None):
+        size = self.count(difficulty)
+        if size == 0:
+            raise KeyError(f"the library has no {difficulty!r} puzzles")
+        return self.get(difficulty, (rng or self.rng).randrange(size))
+
+    '''
+    Returns a random puzzle of a difficulty, so a library can stand in for a
+    PuzzlePool when a Board is created. Like a PuzzlePool, it generates one
+    inline if the library has none of that difficulty: by grade in a graded
+    library, by removing DIFFICULTY_REMOVED cells otherwise
+
+    Parameters:
+    difficulty is a difficulty name
+
+    Return: tuple (puzzle, solution) of 2D Python lists
+    '''
+    def take(self, difficulty):
+        if self.count(difficulty) == 0:
+            if difficulty not in DIFFICULTY_REMOVED:
+                raise ValueError(f"unknown difficulty {difficulty!r}")
+            if self.graded:
+                from sudoku_grader import generate_graded
+                return generate_graded(difficulty, self.rng)
+            return generate_puzzle(9, DIFFICULTY_REMOVED[difficulty], self.rng)
+        _, puzzle, solution, _ = self.random(difficulty)
+        return puzzle, solution
+
+
+'''
+Reads sudoku_batch.py output lines as library entries
+
+Parameters:
+f is an open text file of difficulty,puzzle,solution lines
+grade is whether to grade each puzzle with sudoku_grader and file it under its
+grade instead of the difficulty on its line
+
+Return: generator of tuples (difficulty, puzzle, solution, grade)
+'''
+def read_batch_lines(f, grade=False):
+    if grade:
+        from sudoku_grader import grade_puzzle
+    for line in f:
+        if not line.strip():
+            continue
+        difficulty, puzzle, solution = line.strip().split(",")
+        puzzle = [[int(puzzle[row * 9 + col]) for col in range(9)] for row in range(9)]
+        solution = [[int(solution[row * 9 + col]) for col in range(9)] for row in range(9)]
+        if grade:
+            difficulty = grade_puzzle(puzzle)[0]
+            yield difficulty, puzzle, solution, difficulty
+        else:
+            yield difficulty, puzzle, solution, None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build and inspect puzzle library files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a library from sudoku_batch.py output")
+    build.add_argument("input", help="batch output file, or - for stdin")
+    build.add_argument("output", help="library file to write")
+    build.add_argument("--grade", action="store_true",
+                       help="grade every puzzle with sudoku_grader and file it under its grade")
+    info = commands.add_parser("info", help="show how many puzzles a library holds")
+    info.add_argument("library")
+    show = commands.add_parser("random", help="print a random puzzle of a difficulty")
+    show.add_argument("library")
+    show.add_argument("--difficulty", default="easy")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "build":
+        f = sys.stdin if args.input == "-" else open(args.input)
+        try:
+            counts = write_library(args.output, read_batch_lines(f, args.grade), graded=args.grade)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        print(", ".join(f"{difficulty}: {count}" for difficulty, count in counts.items()))
+    elif args.command == "info":
+        with PuzzleLibrary(args.library) as library:
+            for difficulty in library.difficulties:
+                print(f"{difficulty}: {library.count(difficulty)}")
+            print("filed by grade" if library.graded else "filed by removed cells")
+    else:
+        with PuzzleLibrary(args.library) as library:
+            _, puzzle, solution, grade = library.random(args.difficulty)
+            for row in puzzle:
+                print(" ".join(str(value) if value else "." for value in row))
+            print(f"grade: {grade or 'not graded'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import collections
+import json
+import os
+import random
+import threading
+from sudoku_generator import DIFFICULTY_REMOVED, generate_puzzle
+from sudoku_grader import generate_graded
+"""
+Pool of ready-made puzzles
+Keeps a queue of generated (puzzle, solution) pairs for each difficulty. A
+background thread tops the queues up to their target size, so a new game can
+start without waiting for generation. The pool can be saved to and loaded from
+a JSON file so a fresh start has puzzles ready too.
+"""
+
+
+class PuzzlePool:
+    '''
+    Sets up an empty pool; call start() to begin filling it in the background
+
+    Parameters:
+    removed maps each difficulty to the number of cells to remove (when graded, only
+    its difficulties are used)
+    target_size is how many puzzles to keep ready per difficulty
+    path is the JSON file used by load() and save(), or None for no persistence
+    size is the number of rows/columns of the boards
+    rng is the random.Random the background thread draws from
+    graded is whether puzzles must grade as their difficulty (see sudoku_grader)
+    rather than just have the removed number of cells cleared
+
+    Return:
+    None
+    '''
+    def __init__(self, removed=None, target_size=5, path=None, size=9, rng=None, graded=False):
+        self.removed = dict(removed if removed is not None else DIFFICULTY_REMOVED)
+        self.target_size = target_size
+        self.path = path
+        self.size = size
+        self.rng = rng if rng is not None else random.Random()
+        self.graded = graded
+        self.pools = {difficulty: collections.deque() for difficulty in self.removed}
+        self.lock = threading.Lock()
+        self.wanted = threading.Event()  # Set whenever a queue may have dropped below target
+        self.stopping = False
+        self.thread = None
+
+    '''
+    Generates one puzzle for difficulty
+
+    Parameters:
+    difficulty is one of the pool's difficulties
+    rng is the random.Random to draw from
+
+    Return: tuple (puzzle, solution) of 2D Python lists
+    '''
+    def generate(self, difficulty, rng):
+        if self.graded:
+            return generate_graded(difficulty, rng)
+        return generate_puzzle(self.size, self.removed[difficulty], rng)
+
+    '''
+    Returns a puzzle for difficulty, generating one inline if the pool has none ready
+
+    Parameters:
+    difficulty is one of the pool's difficulties
+
+    Return: tuple (puzzle, solution) of 2D Python lists
+    '''
+    def take(self, difficulty):
+        with self.lock:
+            pool = self.pools[difficulty]
+            item = pool.popleft() if pool else None
+        self.wanted.set()
+        if item is None:
+            item = self.generate(difficulty, random.Random())
+        return item
+
+    '''
+    Returns how many puzzles are ready for difficulty
+
+    Parameters:
+    difficulty is one of the pool's difficulties
+
+    Return: int
+    '''
+    def ready(self, difficulty):
+        with self.lock:
+            return len(self.pools[difficulty])
+
+    '''
+    Returns the difficulty with the fewest puzzles ready, if it is below target
+
+    Parameters: None
+    Return: str or None
+    '''
+    def most_needed(self):
+        with self.lock:
+            difficulty = min(self.pools, key=lambda d: len(self.pools[d]))
+            if len(self.pools[difficulty]) < self.target_size:
+                return difficulty
+        return None
+
+    '''
+    Starts the background thread that keeps every queue at target_size
+
+    Parameters: None
+    Return: None
+    '''
+    def start(self):
+        if self.thread is None:
+            self.stopping = False
+            self.thread = threading.Thread(target=self.run, name="puzzle-pool", daemon=True)
+            self.thread.start()
+
+    '''
+    Stops the background thread after the puzzle it is working on
+
+    Parameters: None
+    Return: None
+    '''
+    def stop(self):
+        if self.thread is not None:
+            self.stopping = True
+            self.wanted.set()
+            self.thread.join()
+            self.thread = None
+
+    '''
+    Body of the background thread: generate for the emptiest queue until all are
+    full, then sleep until take() removes something
+
+    Parameters: None
+    Return: None
+    '''
+    def run(self):
+        while not self.stopping:
+            self.wanted.clear()
+            difficulty = self.most_needed()
+            if difficulty is None:
+                self.wanted.wait()
+                continue
+            item = self.generate(difficulty, self.rng)
+            with self.lock:
+                self.pools[difficulty].append(item)
+
+    '''
+    Writes the ready puzzles to path
+
+    Parameters:
+    path is the file to write, defaulting to the pool's path
+
+    Return: None
+    '''
+    def save(self, path=None):
+        path = path or self.path
+        with self.lock:
+            data = {difficulty: list(pool) for difficulty, pool in self.pools.items()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    '''
+    Adds the puzzles saved in path to the pool
+    A missing or unreadable file is ignored
+
+    Parameters:
+    path is the file to read, defaulting to the pool's path
+
+    Return: None
+    '''
+    def load(self, path=None):
+        path = path or self.path
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            for difficulty, items in data.items():
+                if difficulty in self.pools:
+                    self.pools[difficulty].extend((puzzle, solution) for puzzle, solution in items)
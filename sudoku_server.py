@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import sudoku_solver
+from sudoku_generator import DIFFICULTY_REMOVED, generate_puzzle
+from sudoku_grader import generate_graded
+from sudoku_state import BoardState
+"""
+Local puzzle service
+A long-running asyncio server speaking JSON lines over TCP: each request is one
+JSON object on its own line and gets one JSON object back on its own line.
+
+    {"id": 1, "op": "generate", "difficulty": "hard"}
+    {"id": 2, "op": "validate", "grid": "530070000600195000..."}
+    {"id": 3, "op": "solve", "grid": "530070000600195000..."}
+
+Grids are 81 digits read row by row with 0 (or .) for a blank, or 2D lists.
+Every reply carries the request's id and "ok"; failures carry "error" instead
+of a result. A failed request, even a line longer than LINE_LIMIT, gets its
+error reply and leaves the connection open for the next one.
+
+Generation and solving run in a process pool so the event loop never blocks.
+A queue of ready puzzles per difficulty is filled before the server starts
+listening and topped up in the background as puzzles are handed out. A failed
+generation is retried; after REFILL_RETRIES failures in a row the requests
+waiting for that difficulty get the error instead of waiting forever.
+
+Usage:
+python3 sudoku_server.py serve --port 8765
+python3 sudoku_server.py request '{"op": "generate", "difficulty": "easy"}'
+"""
+
+
+# Longest request line accepted, in bytes
+LINE_LIMIT = 1 << 16
+
+# Background generations of one difficulty that may fail in a row before the
+# requests waiting for it are answered with the error
+REFILL_RETRIES = 3
+
+
+'''
+Generates one puzzle in a worker process
+
+Parameters:
+difficulty is one of DIFFICULTY_REMOVED
+graded is whether the puzzle must grade as difficulty (see sudoku_grader)
+
+Return: tuple (puzzle, solution) of 2D Python lists
+'''
+def generate_task(difficulty, graded):
+    rng = random.Random()
+    if graded:
+        return generate_graded(difficulty, rng)
+    return generate_puzzle(9, DIFFICULTY_REMOVED[difficulty], rng)
+
+
+'''
+Solves a grid in a worker process
+
+Parameters:
+grid is a 2D list of ints with 0 for the blank cells
+
+Return: tuple (solution or None, number of solutions found, stopping at 2)
+'''
+def solve_task(grid):
+    solutions = sudoku_solver.solve_all(grid, 2)
+    return (solutions[0] if solutions else None), len(solutions)
+
+
+'''
+Reads one request line, skipping the whole line if it is longer than LINE_LIMIT
+
+Parameters:
+reader is the connection's asyncio.StreamReader, created with limit=LINE_LIMIT
+
+Return: bytes (empty at the end of the stream), or None for a skipped line
+'''
+async def read_line(reader):
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as error:  # The last line has no newline
+        return error.partial
+    except asyncio.LimitOverrunError as error:
+        consumed = error.consumed
+    # Drop what has arrived of the line so far until its newline turns up
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError as error:
+            consumed = error.consumed
+
+
+'''
+Flattens a 2D board into a string of symbols, row by row
+
+Parameters:
+board is a 2D list of ints
+
+Return: str
+'''
+def board_to_string(board):
+    return "".join(str(value) for row in board for value in row)
+
+
+'''
+Reads a grid from a request
+
+Parameters:
+grid is a string of 81 digits (0 or . for a blank) or a 9x9 list of lists
+
+Return: list[list]
+'''
+def parse_grid(grid):
+    if isinstance(grid, str):
+        grid = grid.strip().replace(".", "0")
+        if len(grid) != 81 or not grid.isdigit():
+            raise ValueError("grid must be 81 digits")
+        return [[int(grid[row * 9 + col]) for col in range(9)] for row in range(9)]
+    if (isinstance(grid, list) and len(grid) == 9
+            and all(isinstance(row, list) and len(row) == 9 for row in grid)
+            and all(isinstance(value, int) and 0 <= value <= 9 for row in grid for value in row)):
+        return grid
+    raise ValueError("grid must be 81 digits or a 9x9 list of ints from 0 to 9")
+
+
+class PuzzleService:
+    '''
+    Sets up the service; call start() before serving
+
+    Parameters:
+    workers is the number of worker processes
+    pool_size is how many puzzles to keep ready per difficulty
+    graded is whether generated puzzles must grade as their difficulty
+
+    Return:
+    None
+    '''
+    def __init__(self, workers=None, pool_size=20, graded=True):
+        self.workers = workers or os.cpu_count()
+        self.pool_size = pool_size
+        self.graded = graded
+        self.executor = None
+        self.ready = {difficulty: asyncio.Queue() for difficulty in DIFFICULTY_REMOVED}
+        self.pending = {difficulty: 0 for difficulty in DIFFICULTY_REMOVED}  # Generations in flight
+        self.waiting = {difficulty: 0 for difficulty in DIFFICULTY_REMOVED}  # Requests waiting for a puzzle
+        self.failures = {difficulty: 0 for difficulty in DIFFICULTY_REMOVED}  # Failed generations in a row
+        self.tasks = set()  # Keeps background refills alive until they finish
+
+    '''
+    Starts the worker processes and fills every puzzle queue
+
+    Parameters: None
+    Return: None
+    '''
+    async def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        wanted = [difficulty for difficulty in self.ready for _ in range(self.pool_size)]
+        items = await asyncio.gather(*(self.run(generate_task, difficulty, self.graded) for difficulty in wanted))
+        for difficulty, item in zip(wanted, items):
+            self.ready[difficulty].put_nowait(item)
+
+    '''
+    Shuts the worker processes down
+
+    Parameters: None
+    Return: None
+    '''
+    async def stop(self):
+        for task in list(self.tasks):
+            task.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    '''
+    Runs fn(*args) in the process pool without blocking the event loop
+
+    Parameters:
+    fn is a module-level function
+    args are its arguments
+
+    Return: the function's result
+    '''
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    '''
+    Generates puzzles in the background until the queue for difficulty is full
+    again, plus one for every request already waiting
+
+    Parameters:
+    difficulty is one of DIFFICULTY_REMOVED
+
+    Return: None
+    '''
+    def refill(self, difficulty):
+        while (self.ready[difficulty].qsize() + self.pending[difficulty]
+               < self.pool_size + self.waiting[difficulty]):
+            self.pending[difficulty] += 1
+            task = asyncio.ensure_future(self.refill_one(difficulty))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    '''
+    One background generation for refill. A failure starts another generation,
+    or after REFILL_RETRIES in a row is queued for each request still waiting
+    without a puzzle, so take() raises it
+
+    Parameters:
+    difficulty is one of DIFFICULTY_REMOVED
+
+    Return: None
+    '''
+    async def refill_one(self, difficulty):
+        try:
+            item = await self.run(generate_task, difficulty, self.graded)
+        except Exception as error:
+            self.pending[difficulty] -= 1
+            self.failures[difficulty] += 1
+            if self.failures[difficulty] < REFILL_RETRIES:
+                self.refill(difficulty)
+                return
+            self.failures[difficulty] = 0
+            queue = self.ready[difficulty]
+            for _ in range(self.waiting[difficulty] - queue.qsize() - self.pending[difficulty]):
+                queue.put_nowait(error)
+        else:
+            self.pending[difficulty] -= 1
+            self.failures[difficulty] = 0
+            self.ready[difficulty].put_nowait(item)
+
+    '''
+    Returns a puzzle for difficulty, waiting for the next one generated if none is
+    ready. Raises the generation's exception if generating kept failing
+
+    Parameters:
+    difficulty is one of DIFFICULTY_REMOVED
+
+    Return: tuple (puzzle, solution) of 2D Python lists
+    '''
+    async def take(self, difficulty):
+        self.waiting[difficulty] += 1
+        self.refill(difficulty)
+        try:
+            item = await self.ready[difficulty].get()
+            if isinstance(item, Exception):
+                raise item
+            return item
+        finally:
+            self.waiting[difficulty] -= 1
+            self.refill(difficulty)
+
+    '''
+    Answers one request
+
+    Parameters:
+    request is the decoded JSON object
+
+    Return: dict (the reply, without the id)
+    '''
+    async def handle_request(self, request):
+        op = request.get('op')
+        if op == 'generate':
+            difficulty = request.get('difficulty', 'easy')
+            if not isinstance(difficulty, str) or difficulty not in self.ready:
+                raise ValueError(f"difficulty must be one of {', '.join(self.ready)}")
+            puzzle, solution = await self.take(difficulty)
+            return {'puzzle': board_to_string(puzzle), 'solution': board_to_string(solution),
+                    'difficulty': difficulty}
+        if op == 'validate':
+            state = BoardState([[0] * 9 for _ in range(9)])
+            for row, values in enumerate(parse_grid(request.get('grid'))):
+                for col, value in enumerate(values):
+                    state.set_value(row, col, value)
+            valid = state.duplicates == 0
+            return {'valid': valid, 'complete': state.is_full(), 'solved': valid and state.is_full(),
+                    'conflicts': [list(cell) for cell in state.conflicting_cells()]}
+        if op == 'solve':
+            solution, count = await self.run(solve_task, parse_grid(request.get('grid')))
+            return {'solution': board_to_string(solution) if solution else None,
+                    'unique': count == 1, 'solvable': count > 0}
+        raise ValueError(f"unknown op {op!r}")
+
+    '''
+    Serves one connection: reads request lines and writes a reply line for each,
+    in order, until the client disconnects
+
+    Parameters:
+    reader and writer are the connection's asyncio streams
+
+    Return: None
+    '''
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await read_line(reader)
+                if line == b"":
+                    break
+                if line is not None and not line.strip():
+                    continue
+                reply = {}
+                try:
+                    if line is None:
+                        raise ValueError(f"request line longer than {LINE_LIMIT} bytes")
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    reply['id'] = request.get('id')
+                    reply.update(await self.handle_request(request))
+                    reply['ok'] = True
+                except ValueError as error:  # Bad requests, including malformed JSON
+                    reply.update(ok=False, error=str(error))
+                except Exception as error:  # Anything else fails this request only
+                    reply.update(ok=False, error=f"internal error: {error!r}")
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    '''
+    Starts the service and serves until cancelled
+
+    Parameters:
+    host and port are the address to listen on
+
+    Return: None
+    '''
+    async def serve(self, host, port):
+        await self.start()
+        server = await asyncio.start_server(self.handle_client, host, port, limit=LINE_LIMIT)
+        print(f"serving on {host}:{port}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+
+'''
+Sends requests over one connection and returns the replies, for local clients and tests
+
+Parameters:
+host and port are the server's address
+requests is a list of dicts
+
+Return: list of reply dicts, in request order
+'''
+async def send_requests(host, port, requests):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for request in requests:
+            writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        return [json.loads(await reader.readline()) for _ in requests]
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local sudoku puzzle service.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to use (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to use (default: 8765)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the server")
+    serve.add_argument("--workers", type=int, default=os.cpu_count(),
+                       help="number of worker processes (default: one per core)")
+    serve.add_argument("--pool-size", type=int, default=20,
+                       help="puzzles kept ready per difficulty (default: 20)")
+    serve.add_argument("--graded", action=argparse.BooleanOptionalAction, default=True,
+                       help="generate puzzles by grade rather than removal count (default: on)")
+    request = commands.add_parser("request", help="send requests to a running server and print the replies")
+    request.add_argument("requests", nargs="+", help="JSON request objects")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "serve":
+        service = PuzzleService(args.workers, args.pool_size, args.graded)
+        try:
+            asyncio.run(service.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        replies = asyncio.run(send_requests(args.host, args.port, [json.loads(r) for r in args.requests]))
+        for reply in replies:
+            print(json.dumps(reply))
+
+
+if __name__ == "__main__":
+    main()
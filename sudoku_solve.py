@@ -0,0 +1,130 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import sudoku_solver
+from sudoku_batch import ordered_map
+"""
+Bulk solving of puzzle files
+Reads puzzles one per line (81 cells row by row, 0 or . for a blank), solves them
+in chunks across a pool of worker processes and writes one line per puzzle, in
+input order:
+
+    <puzzle>,<solution>,<status>,<milliseconds>
+
+where status is unique, multiple (the first solution found is written),
+unsolvable or invalid (a line that is not a puzzle), and solution is empty when
+there is none. The input is read lazily and only a few chunks per worker are in
+flight at a time, so memory stays bounded however large the file is. A summary
+with the totals and puzzles per second goes to stderr.
+
+Usage:
+python3 sudoku_solve.py puzzles.txt --output solutions.txt
+"""
+
+
+'''
+Reads a puzzle line into a 2D board
+
+Parameters:
+line is 81 characters, digits with 0 or . for a blank
+
+Return: list[list], or None if the line is not a puzzle
+'''
+def parse_line(line):
+    if len(line) != 81:
+        return None
+    line = line.replace(".", "0")
+    if not line.isdigit():
+        return None
+    return [[int(line[row * 9 + col]) for col in range(9)] for row in range(9)]
+
+
+'''
+Solves one chunk of puzzle lines in a worker process
+
+Parameters:
+task is a tuple (lines, engine)
+
+Return: list of tuples (output line, status)
+'''
+def solve_chunk(task):
+    lines, engine = task
+    results = []
+    for line in lines:
+        grid = parse_line(line)
+        start = time.perf_counter()
+        if grid is None:
+            solution, status = "", "invalid"
+        else:
+            solutions = sudoku_solver.solve_all(grid, 2, engine)
+            if not solutions:
+                solution, status = "", "unsolvable"
+            else:
+                solution = "".join(str(value) for row in solutions[0] for value in row)
+                status = "unique" if len(solutions) == 1 else "multiple"
+        elapsed = (time.perf_counter() - start) * 1000
+        results.append((f"{line},{solution},{status},{elapsed:.3f}\n", status))
+    return results
+
+
+'''
+Splits the input into chunk tasks for solve_chunk, reading it lazily
+
+Parameters:
+f is an open text file
+chunk_size is the number of puzzles per task
+engine is the solver engine to use
+
+Return: generator of task tuples
+'''
+def make_tasks(f, chunk_size, engine):
+    lines = (line.strip() for line in f)
+    lines = (line for line in lines if line)
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk, engine
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Solve sudoku puzzle files in bulk.")
+    parser.add_argument("input", nargs="?", default="-", help="file of puzzles, or - for stdin (default: -)")
+    parser.add_argument("--output", default="-", help="output file, or - for stdout (default: -)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: one per core)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="puzzles per worker task (default: 500)")
+    parser.add_argument("--engine", choices=["propagation", "dlx"], default="propagation",
+                        help="solver engine (default: propagation)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    source = sys.stdin if args.input == "-" else open(args.input)
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    counts = dict.fromkeys(("unique", "multiple", "unsolvable", "invalid"), 0)
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            tasks = make_tasks(source, args.chunk_size, args.engine)
+            for results in ordered_map(executor, solve_chunk, tasks, 2 * args.workers):
+                out.writelines(line for line, _ in results)
+                for _, status in results:
+                    counts[status] += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(", ".join(f"{status}: {count}" for status, count in counts.items()), file=sys.stderr)
+    print(f"{total} puzzles in {elapsed:.2f} s ({total / elapsed if elapsed else 0:.1f} puzzles/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
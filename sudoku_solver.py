@@ -0,0 +1,774 @@
+import math
+"""
+Sudoku solver for any n x n board (n = 4, 9, 16, 25)
+Two engines share the same interface:
+
+dlx: Sudoku is encoded as an exact-cover problem and solved with Knuth's
+Algorithm X using dancing links. The links are kept in flat Python lists (one
+entry per node) rather than node objects. Every (row, col, digit) placement is
+one matrix row covering four columns: the cell itself, and the digit in its
+row, its column and its box.
+
+propagation: one candidate bitmask per cell, narrowed by naked and hidden
+singles after every guess, branching on the cell with the fewest candidates.
+It also solves variants (see sudoku_variants): extra units simply join the rows,
+columns and boxes, and killer cages are checked against the digit sets that can
+make up their sums.
+
+Both searches use an explicit stack so that large boards do not run into the
+recursion limit. Given a sudoku_instrument.Instrument, they add the search states
+they visit to its 'dlx_nodes' or 'propagation_nodes' counter.
+"""
+
+
+class ExactCover:
+    '''
+    Builds the dancing links structure for an exact-cover matrix
+
+    Parameters:
+    n_columns is the number of columns in the matrix
+    rows is a list of lists, each holding the column indexes covered by that matrix row
+    n_primary is the number of primary columns; columns from n_primary onwards are
+    secondary (they may be covered at most once instead of exactly once)
+
+    Node 0 is the root, nodes 1..n_columns are the column headers and every matrix
+    row adds one node per covered column after that.
+
+    Return:
+    None
+    '''
+    def __init__(self, n_columns, rows, n_primary=None):
+        if n_primary is None:
+            n_primary = n_columns
+        size = n_columns + 1 + sum(len(row) for row in rows)
+        L = list(range(-1, size - 1))
+        R = list(range(1, size + 1))
+        U = list(range(size))
+        D = list(range(size))
+        C = list(range(size))
+        S = [0] * (n_columns + 1)
+        ROW = [-1] * size
+
+        # Link the primary headers into a ring with the root, secondary headers link to themselves
+        L[0] = n_primary
+        R[n_primary] = 0
+        for col in range(n_primary + 1, n_columns + 1):
+            L[col] = R[col] = col
+
+        node = n_columns + 1
+        first_nodes = []
+        for row_id, cols in enumerate(rows):
+            first = node
+            for col in cols:
+                header = col + 1
+                C[node] = header
+                ROW[node] = row_id
+                U[node] = U[header]
+                D[node] = header
+                D[U[header]] = node
+                U[header] = node
+                S[header] += 1
+                node += 1
+            L[first] = node - 1
+            R[node - 1] = first
+            first_nodes.append(first)
+
+        self.L, self.R, self.U, self.D, self.C, self.S = L, R, U, D, C, S
+        self.ROW = ROW
+        self.first_nodes = first_nodes
+        self.covered = [False] * (n_columns + 1)
+
+    '''
+    Returns an independent copy of the structure
+    The row/column bookkeeping never changes, so it is shared with the copy
+
+    Parameters: None
+    Return: ExactCover
+    '''
+    def copy(self):
+        other = ExactCover.__new__(ExactCover)
+        other.L, other.R, other.U, other.D = self.L[:], self.R[:], self.U[:], self.D[:]
+        other.S = self.S[:]
+        other.covered = self.covered[:]
+        other.C = self.C
+        other.ROW = self.ROW
+        other.first_nodes = self.first_nodes
+        return other
+
+    '''
+    Removes column header c and every row that covers it
+
+    Parameters:
+    c is the header node of the column
+
+    Return: None
+    '''
+    def cover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        R[L[c]] = R[c]
+        L[R[c]] = L[c]
+        self.covered[c] = True
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    '''
+    Restores column header c, exactly undoing cover(c)
+
+    Parameters:
+    c is the header node of the column
+
+    Return: None
+    '''
+    def uncover(self, c):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        self.covered[c] = False
+        R[L[c]] = c
+        L[R[c]] = c
+
+    '''
+    Commits matrix row row_id to the solution by covering all of its columns
+    Used to enter the givens before searching
+
+    Parameters:
+    row_id is the index of the matrix row
+
+    Return:
+    boolean (False if the row clashes with an already selected row)
+    '''
+    def select(self, row_id):
+        first = self.first_nodes[row_id]
+        node = first
+        while True:
+            if self.covered[self.C[node]]:
+                return False
+            node = self.R[node]
+            if node == first:
+                break
+        while True:
+            self.cover(self.C[node])
+            node = self.R[node]
+            if node == first:
+                return True
+
+    '''
+    Deletes matrix row row_id so the search can never choose it
+    The row must not have been selected
+
+    Parameters:
+    row_id is the index of the matrix row
+
+    Return: None
+    '''
+    def exclude(self, row_id):
+        U, D, S, C = self.U, self.D, self.S, self.C
+        first = self.first_nodes[row_id]
+        node = first
+        while True:
+            if D[U[node]] == node:
+                U[D[node]] = U[node]
+                D[U[node]] = D[node]
+                S[C[node]] -= 1
+            node = self.R[node]
+            if node == first:
+                return
+
+    '''
+    Runs Algorithm X from the current state
+    Always branches on the primary column with the fewest remaining rows
+
+    Parameters:
+    limit stops the search after that many solutions (0 means no limit)
+    max_nodes gives up after that many rows have been tried (0 means no limit)
+    and sets self.gave_up
+    instrument is a sudoku_instrument.Instrument to count the search states in, or None
+
+    Return:
+    generator of lists of row ids, one list per solution (excluding selected givens)
+    '''
+    def search(self, limit=0, max_nodes=0, instrument=None):
+        L, R, D, C, S, ROW = self.L, self.R, self.D, self.C, self.S, self.ROW
+        cover, uncover = self.cover, self.uncover
+        stack = []
+        found = 0
+        nodes = 0
+        self.gave_up = False
+        forward = True
+        try:
+            while True:
+                nodes += 1
+                if max_nodes and nodes > max_nodes:
+                    self.gave_up = True
+                    return
+                if forward:
+                    if R[0] == 0:
+                        yield [ROW[node] for node in stack]
+                        found += 1
+                        if limit and found >= limit:
+                            return
+                        forward = False
+                    else:
+                        # Pick the most constrained column
+                        c = R[0]
+                        best = S[c]
+                        j = R[c]
+                        while j != 0 and best > 1:
+                            if S[j] < best:
+                                c = j
+                                best = S[j]
+                            j = R[j]
+                        if best == 0:
+                            forward = False
+                        else:
+                            cover(c)
+                            r = D[c]
+                            stack.append(r)
+                            j = R[r]
+                            while j != r:
+                                cover(C[j])
+                                j = R[j]
+                            continue
+
+                # Backtrack: undo the deepest choice and try the next row in its column
+                while stack:
+                    r = stack.pop()
+                    c = C[r]
+                    j = L[r]
+                    while j != r:
+                        uncover(C[j])
+                        j = L[j]
+                    r = D[r]
+                    if r != c:
+                        stack.append(r)
+                        j = R[r]
+                        while j != r:
+                            cover(C[j])
+                            j = R[j]
+                        forward = True
+                        break
+                    uncover(c)
+                else:
+                    return
+        finally:
+            if instrument is not None:
+                instrument.count('dlx_nodes', nodes)
+
+
+'''
+Returns the units (rows, columns and boxes) of a board as lists of cell indexes
+Cells are numbered row by row, so (row, col) is index row * row_length + col
+
+Parameters:
+box_length is the side length of one box (3 for a 9x9 board)
+
+Return: list[list]
+'''
+def sudoku_units(box_length):
+    n = box_length * box_length
+    rows = [[r * n + c for c in range(n)] for r in range(n)]
+    cols = [[r * n + c for r in range(n)] for c in range(n)]
+    boxes = []
+    for br in range(0, n, box_length):
+        for bc in range(0, n, box_length):
+            boxes.append([(br + i) * n + bc + j for i in range(box_length) for j in range(box_length)])
+    return rows + cols + boxes
+
+
+_templates = {}
+
+
+'''
+Returns the (cached) empty exact-cover matrix for a board with the given box size
+Matrix row (cell * n + digit - 1) places digit in cell
+
+Parameters:
+box_length is the side length of one box
+
+Return: ExactCover
+'''
+def sudoku_matrix(box_length):
+    template = _templates.get(box_length)
+    if template is None:
+        n = box_length * box_length
+        units = sudoku_units(box_length)
+        cell_units = [[] for _ in range(n * n)]
+        for u, unit in enumerate(units):
+            for cell in unit:
+                cell_units[cell].append(u)
+        rows = []
+        for cell in range(n * n):
+            for d in range(n):
+                rows.append([cell] + [n * n + u * n + d for u in cell_units[cell]])
+        template = ExactCover(n * n + len(units) * n, rows)
+        _templates[box_length] = template
+    return template
+
+
+_geometries = {}
+
+
+'''
+Returns the (cached) units and peers of a board with the given box size
+The peers of a cell are the other cells sharing a row, column or box with it
+
+Parameters:
+box_length is the side length of one box
+
+Return: tuple (units, peers)
+'''
+def _geometry(box_length):
+    geometry = _geometries.get(box_length)
+    if geometry is None:
+        n = box_length * box_length
+        units = sudoku_units(box_length)
+        peers = [set() for _ in range(n * n)]
+        for unit in units:
+            for cell in unit:
+                peers[cell].update(unit)
+        peers = [tuple(sorted(p - {cell})) for cell, p in enumerate(peers)]
+        geometry = (units, peers)
+        _geometries[box_length] = geometry
+    return geometry
+
+
+'''
+Applies naked and hidden singles until nothing changes
+cands holds one digit bitmask per cell (bit num - 1 set when num is still possible)
+and is updated in place. Every cell in queue must already be down to one candidate;
+its digit is eliminated from all of its peers
+
+Every cage narrows its cells to the digits of the combinations that still fit
+them: each combination must have a candidate in every cell of the cage and every
+one of its digits must have a cell to go in
+
+Parameters:
+cands is the list of candidate bitmasks
+queue is a list of cells whose single digit still has to be eliminated from their peers
+units and peers come from _geometry (or a variant)
+full is the bitmask with every digit set
+cages is a sequence of (cells, combinations) pairs, where combinations are the
+digit bitmasks that add up to the cage's sum (see sudoku_variants.Variant)
+
+Return:
+boolean (False if some cell, unit or cage ran out of candidates)
+'''
+def _propagate(cands, queue, units, peers, full, cages=()):
+    while True:
+        # Naked singles: a solved cell removes its digit from every peer
+        while queue:
+            cell = queue.pop()
+            bit = cands[cell]
+            for p in peers[cell]:
+                m = cands[p]
+                if m & bit:
+                    m ^= bit
+                    if not m:
+                        return False
+                    cands[p] = m
+                    if not m & (m - 1):
+                        queue.append(p)
+
+        # Hidden singles: a digit with only one place left in a unit goes there
+        for unit in units:
+            once = twice = 0
+            for cell in unit:
+                m = cands[cell]
+                twice |= once & m
+                once |= m
+            if once != full:
+                return False
+            exactly = once & ~twice
+            if exactly:
+                for cell in unit:
+                    m = cands[cell]
+                    hit = m & exactly
+                    if hit and hit != m:
+                        if hit & (hit - 1):
+                            return False
+                        cands[cell] = hit
+                        queue.append(cell)
+
+        # Cages: only digits of a combination that still fits may stay
+        for cells, combos in cages:
+            present = 0
+            for cell in cells:
+                present |= cands[cell]
+            allowed = 0
+            for combo in combos:
+                if not combo & ~present and all(cands[cell] & combo for cell in cells):
+                    allowed |= combo
+            if not allowed:
+                return False
+            for cell in cells:
+                m = cands[cell]
+                if m & ~allowed:
+                    m &= allowed
+                    if not m:
+                        return False
+                    cands[cell] = m
+                    if not m & (m - 1):
+                        queue.append(cell)
+        if not queue:
+            return True
+
+
+'''
+Depth-first search over candidate bitmasks with propagation after every guess
+Branches on the unsolved cell with the fewest candidates. The explicit stack holds
+propagated copies of the candidate list, so there is no recursion
+
+Parameters:
+cands is the propagated candidate list to start from
+limit stops the search after that many solutions (0 means no limit)
+units, peers, full and cages are as for _propagate
+max_nodes gives up after that many search states (0 means no limit); giving up
+is signalled by yielding None
+rng, if given, shuffles the order in which the digits of each branch are tried
+instrument is a sudoku_instrument.Instrument to count the search states in, or None
+
+Return:
+generator of solved candidate lists
+'''
+def _propagation_search(cands, limit, units, peers, full, cages=(), max_nodes=0, rng=None, instrument=None):
+    stack = [cands]
+    found = 0
+    nodes = 0
+    size = len(cands)
+    try:
+        while stack:
+            nodes += 1
+            if max_nodes and nodes > max_nodes:
+                yield None
+                return
+            cands = stack.pop()
+            best = -1
+            best_count = size
+            for cell, m in enumerate(cands):
+                if m & (m - 1):
+                    count = m.bit_count()
+                    if count < best_count:
+                        best = cell
+                        best_count = count
+                        if count == 2:
+                            break
+            if best < 0:
+                yield cands
+                found += 1
+                if limit and found >= limit:
+                    return
+                continue
+
+            # Push the branches so that the lowest digit is explored first
+            branches = []
+            m = cands[best]
+            while m:
+                bit = m & -m
+                m ^= bit
+                child = cands[:]
+                child[best] = bit
+                if _propagate(child, [best], units, peers, full, cages):
+                    branches.append(child)
+            branches.reverse()
+            if rng is not None:
+                rng.shuffle(branches)
+            stack.extend(branches)
+    finally:
+        if instrument is not None:
+            instrument.count('propagation_nodes', nodes)
+
+
+'''
+Builds and propagates the candidate list for grid
+
+Parameters:
+grid is a 2D list of ints, 0 for empty cells
+exclude is an iterable of (row, col, num) placements the search may not use
+variant is a sudoku_variants.Variant for the board, or None for classic rules
+
+Return:
+tuple (cands, units, peers, full, cages), or None if the givens contradict each other
+'''
+def _load_candidates(grid, exclude=(), variant=None):
+    box_length = box_length_of(grid)
+    n = len(grid)
+    full = (1 << n) - 1
+    if variant is None:
+        units, peers = _geometry(box_length)
+        cages = ()
+        cands = [full] * (n * n)
+    else:
+        if variant.box_length != box_length:
+            raise ValueError("the variant is for a different board size")
+        units, peers, cages = variant.units, variant.peers, variant.solver_cages
+        cands = list(variant.cell_masks)
+    for r, c, value in exclude:
+        cands[r * n + c] &= ~(1 << (value - 1))
+    queue = []
+    for r, row in enumerate(grid):
+        for c, value in enumerate(row):
+            if value:
+                if not 1 <= value <= n:
+                    return None
+                bit = 1 << (value - 1)
+                if not cands[r * n + c] & bit:
+                    return None
+                cands[r * n + c] = bit
+                queue.append(r * n + c)
+    if 0 in cands or not _propagate(cands, queue, units, peers, full, cages):
+        return None
+    return cands, units, peers, full, cages
+
+
+'''
+Determines the box length of a square board from its side length
+
+Parameters:
+grid is a 2D list representing the board
+
+Return: int
+'''
+def box_length_of(grid):
+    box_length = math.isqrt(len(grid))
+    if box_length * box_length != len(grid) or any(len(row) != len(grid) for row in grid):
+        raise ValueError("grid must be square with a perfect-square side length")
+    return box_length
+
+
+'''
+Prepares a matrix with the givens of grid already selected
+
+Parameters:
+grid is a 2D list of ints, 0 for empty cells
+exclude is an iterable of (row, col, num) placements the search may not use
+
+Return:
+ExactCover, or None if the givens contradict each other
+'''
+def _load(grid, exclude=()):
+    box_length = box_length_of(grid)
+    n = len(grid)
+    matrix = sudoku_matrix(box_length).copy()
+    for r, c, value in exclude:
+        matrix.exclude((r * n + c) * n + value - 1)
+    for r, row in enumerate(grid):
+        for c, value in enumerate(row):
+            if value:
+                if not 1 <= value <= n or not matrix.select((r * n + c) * n + value - 1):
+                    return None
+    return matrix
+
+
+'''
+Writes the placements of a search result into a copy of grid
+
+Parameters:
+grid is the 2D list the search was started from
+rows is one solution yielded by ExactCover.search
+
+Return: list[list]
+'''
+def _apply(grid, rows):
+    n = len(grid)
+    board = [row[:] for row in grid]
+    for row_id in rows:
+        cell, d = divmod(row_id, n)
+        board[cell // n][cell % n] = d + 1
+    return board
+
+
+'''
+Yields the solutions of grid one at a time
+Two engines are available: 'dlx' (dancing links) and 'propagation' (candidate
+bitmasks with naked/hidden singles and fewest-candidates branching). Propagation
+is the default: it is faster on 9x9 puzzles and its per-call setup grows with
+the number of cells rather than with the size of the exact-cover matrix, which
+keeps it fast on 16x16 and 25x25 boards
+
+Parameters:
+grid is a 2D list of ints, 0 for empty cells (any n x n board with n a perfect square)
+limit stops after that many solutions (0 means all of them)
+exclude is an iterable of (row, col, num) placements the solutions may not use
+engine is 'propagation' or 'dlx'
+variant is a sudoku_variants.Variant whose rules also apply (propagation engine only)
+instrument is a sudoku_instrument.Instrument to count the search states in, or None
+
+Return: generator of list[list]
+'''
+def iter_solutions(grid, limit=0, exclude=(), engine='propagation', variant=None, instrument=None):
+    if engine == 'dlx':
+        if variant is not None:
+            raise ValueError("variants need the propagation engine")
+        matrix = _load(grid, exclude)
+        if matrix is None:
+            return
+        for rows in matrix.search(limit, instrument=instrument):
+            yield _apply(grid, rows)
+    elif engine == 'propagation':
+        state = _load_candidates(grid, exclude, variant)
+        if state is None:
+            return
+        n = len(grid)
+        for cands in _propagation_search(state[0], limit, *state[1:], instrument=instrument):
+            yield [[cands[r * n + c].bit_length() for c in range(n)] for r in range(n)]
+    else:
+        raise ValueError(f"unknown engine {engine!r}")
+
+
+'''
+Returns the first solution of grid, or None if it has none
+grid is not modified
+
+Parameters:
+grid is a 2D list of ints, 0 for empty cells
+engine is 'propagation' or 'dlx'
+variant is a sudoku_variants.Variant whose rules also apply, or None
+instrument is a sudoku_instrument.Instrument to count the search states in, or None
+
+Return: list[list] or None
+'''
+def solve(grid, engine='propagation', variant=None, instrument=None):
+    for solution in iter_solutions(grid, 1, engine=engine, variant=variant, instrument=instrument):
+        return solution
+    return None
+
+
+'''
+Counts the solutions of grid, stopping early once limit is reached
+count_solutions(grid, 2) == 1 is the usual uniqueness test: the search stops as
+soon as a second solution turns up instead of exploring the whole tree
+
+Parameters:
+grid is a 2D list of ints, 0 for empty cells
+limit stops counting after that many solutions (0 means count them all)
+exclude is an iterable of (row, col, num) placements the solutions may not use
+engine is 'propagation' or 'dlx'
+max_nodes bounds the work done; if the search gives up, the result is one more
+than the solutions found so far (and at least limit), which keeps uniqueness
+tests on the safe side
+variant is a sudoku_variants.Variant whose rules also apply (propagation engine only)
+instrument is a sudoku_instrument.Instrument to count the search states in, or None
+
+Return: int
+'''
+def count_solutions(grid, limit=0, exclude=(), engine='propagation', max_nodes=0, variant=None,
+                    instrument=None):
+    if engine == 'dlx':
+        if variant is not None:
+            raise ValueError("variants need the propagation engine")
+        matrix = _load(grid, exclude)
+        if matrix is None:
+            return 0
+        count = sum(1 for _ in matrix.search(limit, max_nodes, instrument))
+        return max(limit, count + 1) if matrix.gave_up else count
+    elif engine == 'propagation':
+        state = _load_candidates(grid, exclude, variant)
+        if state is None:
+            return 0
+        count = 0
+        for cands in _propagation_search(state[0], limit, *state[1:], max_nodes, instrument=instrument):
+            if cands is None:
+                return max(limit, count + 1)
+            count += 1
+        return count
+    raise ValueError(f"unknown engine {engine!r}")
+
+
+'''
+Counts the solutions of a board given as candidate bitmasks instead of a grid
+Callers that keep their own candidates up to date (such as the generator's unit
+bitmasks) can skip rebuilding them from the givens on every check
+
+Parameters:
+cands is a list with one digit bitmask per cell (bit num - 1 set when num is
+possible there); givens are single bits, and the list is not modified
+box_length is the box size of the board
+limit stops counting after that many solutions (0 means count them all)
+max_nodes is as for count_solutions
+variant is a sudoku_variants.Variant whose rules also apply, or None
+instrument is a sudoku_instrument.Instrument to count the search states in, or None
+
+Return: int
+'''
+def count_candidates(cands, box_length, limit=0, max_nodes=0, variant=None, instrument=None):
+    if variant is None:
+        units, peers = _geometry(box_length)
+        cages = ()
+    else:
+        units, peers, cages = variant.units, variant.peers, variant.solver_cages
+    full = (1 << (box_length * box_length)) - 1
+    if 0 in cands:
+        return 0
+    cands = list(cands)
+    queue = [cell for cell, m in enumerate(cands) if not m & (m - 1)]
+    if not _propagate(cands, queue, units, peers, full, cages):
+        return 0
+    count = 0
+    for result in _propagation_search(cands, limit, units, peers, full, cages, max_nodes, instrument=instrument):
+        if result is None:
+            return max(limit, count + 1)
+        count += 1
+    return count
+
+
+'''
+Returns every solution of grid (up to limit)
+
+Parameters:
+grid is a 2D list of ints, 0 for empty cells
+limit stops after that many solutions (0 means all of them)
+engine is 'propagation' or 'dlx'
+variant is a sudoku_variants.Variant whose rules also apply, or None
+instrument is a sudoku_instrument.Instrument to count the search states in, or None
+
+Return: list of list[list]
+'''
+def solve_all(grid, limit=0, engine='propagation', variant=None, instrument=None):
+    return list(iter_solutions(grid, limit, engine=engine, variant=variant, instrument=instrument))
+
+
+'''
+Returns a random complete board
+The propagation search runs on an empty board, trying the digits of every
+branch in random order, so any board the rules allow can come out. A random
+search now and then wanders into a part of the tree with no solution, so it is
+restarted with a doubled node budget whenever it runs out
+
+Parameters:
+box_length is the side length of one box
+rng is the random.Random to draw from
+variant is a sudoku_variants.Variant whose rules the board must follow, or None
+instrument is a sudoku_instrument.Instrument to count the search states in, or None
+
+Return: list[list], or None if the rules allow no board at all
+'''
+def random_solution(box_length, rng, variant=None, instrument=None):
+    n = box_length * box_length
+    grid = [[0] * n for _ in range(n)]
+    state = _load_candidates(grid, (), variant)
+    if state is None:
+        return None
+    budget = 4 * n * n
+    while True:
+        for cands in _propagation_search(state[0][:], 1, *state[1:], max_nodes=budget, rng=rng,
+                                         instrument=instrument):
+            if cands is None:
+                break
+            return [[cands[r * n + c].bit_length() for c in range(n)] for r in range(n)]
+        else:
+            return None
+        budget *= 2
@@ -0,0 +1,487 @@
+import math
+import sudoku_grader
+import sudoku_solver
+"""
+Board state for a game in progress, independent of any user interface
+Holds the puzzle as given, the player's entries and sketches and the solution,
+and answers the rule questions (is the board full, is it valid) the game loop needs.
+
+Everything is stored in flat bytearrays with one byte per cell, indexed
+row * row_length + col, so a 9x9 game costs a few hundred bytes and nothing has
+to be copied between separate 2D lists to stay in sync.
+
+Every row, column and box keeps a count of each digit in it. Entering or
+clearing a value only touches the counts of that cell's three units, so the
+full/valid checks and per-cell conflict lookups never rescan the grid. The
+digits present in each unit are kept as bitmasks alongside the counts, and the
+candidates of every cell (for pencil marks and hints) are kept up to date from
+them, so a hint never has to work them out for the whole board.
+
+Boards with variant rules use sudoku_variants.VariantState, which counts the
+extra units and cages of the variant the same way.
+"""
+
+
+_unit_tables = {}
+
+# Bounds the grader's work for one hint so it fits in a frame: the number of
+# technique passes it may make is this divided by the number of cells, which
+# leaves 9x9 hints unbounded in practice and stops 25x25 hints after six passes
+HINT_WORK = 4000
+
+
+'''
+Returns the (cached) units of a board and the units each cell belongs to
+Shared by every BoardState with the same box size
+
+Parameters:
+box_length is the side length of one box
+
+Return: tuple (units, cell_units) of tuples of ints
+'''
+def unit_tables(box_length):
+    tables = _unit_tables.get(box_length)
+    if tables is None:
+        units = sudoku_solver.sudoku_units(box_length)
+        cell_units = [[] for _ in range(box_length ** 4)]
+        for u, unit in enumerate(units):
+            for cell in unit:
+                cell_units[cell].append(u)
+        tables = (tuple(tuple(unit) for unit in units), tuple(tuple(u) for u in cell_units))
+        _unit_tables[box_length] = tables
+    return tables
+
+
+'''
+Flattens a 2D board into a bytearray, row by row
+
+Parameters:
+grid is a 2D list of ints
+
+Return: bytearray
+'''
+def flatten(grid):
+    return bytearray(value for row in grid for value in row)
+
+
+class BoardState:
+    variant = None  # A sudoku_variants.Variant on VariantState boards
+    instrument = None  # A sudoku_instrument.Instrument the solver reports to, set by Board
+
+    '''
+    Sets up the state for a new game
+
+    Parameters:
+    puzzle is a 2D list of ints with 0 for the blank cells
+    solution is the solved board as a 2D list, or None to solve the puzzle when needed
+
+    Return:
+    None
+    '''
+    def __init__(self, puzzle, solution=None):
+        self.row_length = len(puzzle)
+        self.box_length = math.isqrt(self.row_length)
+        size = self.row_length * self.row_length
+        self.givens = flatten(puzzle)
+        self.values = bytearray(size)
+        self.sketches = bytearray(size)
+        self.solution = flatten(solution) if solution is not None else None
+
+        # counts[unit * (row_length + 1) + num] is how often num appears in that row, column or box
+        if self.variant is None:
+            self.units, self.cell_units = unit_tables(self.box_length)
+        else:
+            self.units, self.cell_units = self.variant.groups, self.variant.cell_groups
+        # Units holding every digit come first, before any cages
+        self.full_units = len(self.units) if self.variant is None else len(self.variant.units)
+        self.counts = bytearray(len(self.units) * (self.row_length + 1))
+        self.unit_masks = [0] * len(self.units)  # Bit num - 1 set while num is in the unit
+        self.full_mask = (1 << self.row_length) - 1
+        self.filled = 0        # number of non-empty cells
+        self.duplicates = 0    # number of (unit, num) pairs where num appears more than once
+        self.cands = None      # candidate_mask of every cell, worked out once the givens are in
+        for index, num in enumerate(self.givens):
+            if num:
+                self.set_index(index, num)
+        self.cands = [self.candidate_mask(index) for index in range(size)]
+
+    '''
+    Returns the flat index of (row, col)
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: int
+    '''
+    def index(self, row, col):
+        return row * self.row_length + col
+
+    '''
+    Returns the value at (row, col), 0 if the cell is empty
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: int
+    '''
+    def get(self, row, col):
+        return self.values[row * self.row_length + col]
+
+    '''
+    Returns the current values as a 2D list (a copy)
+
+    Parameters: None
+    Return: list[list]
+    '''
+    @property
+    def board(self):
+        n = self.row_length
+        return [list(self.values[i:i + n]) for i in range(0, n * n, n)]
+
+    '''
+    Returns the original puzzle as a 2D list (a copy)
+
+    Parameters: None
+    Return: list[list]
+    '''
+    @property
+    def original_board(self):
+        n = self.row_length
+        return [list(self.givens[i:i + n]) for i in range(0, n * n, n)]
+
+    '''
+    Writes num into the cell at a flat index, updating the digit counts of its
+    units and the candidates of the cells in them
+    This does not check whether the cell is part of the original puzzle
+
+    Parameters:
+    index is the flat index of the cell
+    num is the value to write, 0 to empty the cell
+
+    Return: None
+    '''
+    def set_index(self, index, num):
+        old = self.values[index]
+        if old == num:
+            return
+        self.values[index] = num
+        counts = self.counts
+        masks = self.unit_masks
+        stride = self.row_length + 1
+        for u in self.cell_units[index]:
+            if old:
+                i = u * stride + old
+                counts[i] -= 1
+                if counts[i] == 1:
+                    self.duplicates -= 1
+                elif counts[i] == 0:
+                    masks[u] &= ~(1 << (old - 1))
+            if num:
+                i = u * stride + num
+                counts[i] += 1
+                if counts[i] == 2:
+                    self.duplicates += 1
+                elif counts[i] == 1:
+                    masks[u] |= 1 << (num - 1)
+        self.filled += (num != 0) - (old != 0)
+        cands = self.cands
+        if cands is not None:
+            candidate_mask = self.candidate_mask
+            for u in self.cell_units[index]:
+                for cell in self.units[u]:
+                    cands[cell] = candidate_mask(cell)
+
+    '''
+    Writes num into (row, col), updating the digit counts of the cell's units
+    This does not check whether the cell is part of the original puzzle
+
+    Parameters:
+    row and col are the row index and col index of the cell
+    num is the value to write, 0 to empty the cell
+
+    Return: None
+    '''
+    def set_value(self, row, col, num):
+        self.set_index(row * self.row_length + col, num)
+
+    '''
+    Returns whether (row, col) was filled in the original puzzle
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: boolean
+    '''
+    def is_given(self, row, col):
+        return self.givens[row * self.row_length + col] != 0
+
+    '''
+    Returns the sketched value at (row, col), 0 if there is none
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: int
+    '''
+    def get_sketch(self, row, col):
+        return self.sketches[row * self.row_length + col]
+
+    '''
+    Sets the sketched value at (row, col)
+
+    Parameters:
+    row and col are the row index and col index of the cell
+    value is the sketched value, 0 to remove it
+
+    Return: None
+    '''
+    def set_sketch(self, row, col, value):
+        self.sketches[row * self.row_length + col] = value
+
+    '''
+    Enters value at (row, col) unless the cell is part of the original puzzle
+
+    Parameters:
+    row and col are the row index and col index of the cell
+    value is the number to enter
+
+    Return:
+    boolean (whether the value was entered)
+    '''
+    def place(self, row, col, value):
+        if self.is_given(row, col):
+            return False
+        self.set_value(row, col, value)
+        return True
+
+    '''
+    Empties (row, col) and its sketch unless the cell is part of the original puzzle
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return:
+    boolean (whether the cell was cleared)
+    '''
+    def clear(self, row, col):
+        if not self.place(row, col, 0):
+            return False
+        self.set_sketch(row, col, 0)
+        return True
+
+    '''
+    Removes every entry and sketch the player has made
+
+    Parameters: None
+    Return: None
+    '''
+    def reset(self):
+        for index, given in enumerate(self.givens):
+            if not given:
+                self.set_index(index, 0)
+        self.sketches[:] = bytes(len(self.sketches))
+
+    '''
+    Returns whether every cell holds a value
+
+    Parameters: None
+    Return: boolean
+    '''
+    def is_full(self):
+        return self.filled == len(self.values)
+
+    '''
+    Returns the first empty cell, reading row by row
+
+    Parameters: None
+    Return: tuple (row, col), or None if the board is full
+    '''
+    def find_empty(self):
+        index = self.values.find(0)
+        if index < 0:
+            return None
+        return divmod(index, self.row_length)
+
+    '''
+    Determines if num could be entered at (row, col) without repeating a value
+    in the cell's row, column or box. The cell itself is not looked at
+
+    Parameters:
+    row and col are the row index and col index of the cell
+    num is the value to test
+
+    Return: boolean
+    '''
+    def is_valid(self, row, col, num):
+        index = row * self.row_length + col
+        own = self.values[index] == num
+        stride = self.row_length + 1
+        for u in self.cell_units[index]:
+            if self.counts[u * stride + num] > own:
+                return False
+        return True
+
+    '''
+    Returns whether the value at (row, col) also appears elsewhere in its row,
+    column or box. Empty cells never conflict
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: boolean
+    '''
+    def is_conflict(self, row, col):
+        index = row * self.row_length + col
+        num = self.values[index]
+        if num == 0:
+            return False
+        stride = self.row_length + 1
+        for u in self.cell_units[index]:
+            if self.counts[u * stride + num] > 1:
+                return True
+        return False
+
+    '''
+    Returns the values that could still go in the cell at a flat index without
+    repeating a value in its row, column or box
+
+    Parameters:
+    index is the flat index of the cell
+
+    Return: int bitmask (bit num - 1 set when num is possible), 0 for a filled cell
+    '''
+    def candidate_mask(self, index):
+        if self.values[index]:
+            return 0
+        masks = self.unit_masks
+        used = 0
+        for u in self.cell_units[index]:
+            used |= masks[u]
+        return self.full_mask & ~used
+
+    '''
+    Returns the values that could still go in (row, col), for pencil marks
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: list of ints, empty for a filled cell
+    '''
+    def candidates(self, row, col):
+        mask = self.candidate_mask(row * self.row_length + col)
+        return [num for num in range(1, self.row_length + 1) if mask & (1 << (num - 1))]
+
+    '''
+    Returns the next move a player could work out, and how
+    Wrong entries are pointed out first, when the solution is known (the hint
+    never solves the puzzle itself). Then singles are found straight from the
+    candidates kept by set_index; only when there are none does the grader run its
+    harder techniques, starting from the same candidates
+
+    Parameters: None
+    Return: tuple (row, col, value, technique name), or None if the board is solved
+    '''
+    def hint(self):
+        n = self.row_length
+        if self.solution is not None:
+            for index, num in enumerate(self.values):
+                if num and num != self.solution[index]:
+                    return index // n, index % n, self.solution[index], 'mistake'
+        if self.is_full():
+            return None
+
+        # Naked single: a cell with one candidate left
+        cands = self.cands
+        for index, mask in enumerate(cands):
+            if mask and mask & (mask - 1) == 0:
+                return index // n, index % n, mask.bit_length(), 'naked_single'
+
+        # Hidden single: the only place for a value in one of its units
+        for unit in self.units[:self.full_units]:
+            once = more = 0
+            for index in unit:
+                more |= once & cands[index]
+                once |= cands[index]
+            singles = once & ~more
+            if singles:
+                bit = singles & -singles
+                for index in unit:
+                    if cands[index] & bit:
+                        return index // n, index % n, bit.bit_length(), 'hidden_single'
+        return self.harder_move(cands)
+
+    '''
+    Returns the next move when there are no singles, from the grader. When the
+    grader runs out of its HINT_WORK budget the move is a guess
+
+    Parameters:
+    cands is the list of candidate bitmasks of every cell
+
+    Return: tuple (row, col, value, technique name), or None
+    '''
+    def harder_move(self, cands):
+        n = self.row_length
+        move = sudoku_grader.Grader(self.board, cands).next_move(max(1, HINT_WORK // len(self.values)))
+        if move is None:
+            return None
+        index, num, technique = move
+        if technique == 'guess' and self.solution is not None:
+            num = self.solution[index]
+        return index // n, index % n, num, technique
+
+    '''
+    Returns every cell whose value repeats in its row, column or box
+
+    Parameters: None
+    Return: list of tuples (row, col)
+    '''
+    def conflicting_cells(self):
+        if self.duplicates == 0:
+            return []
+        return [(i, j) for i in range(self.row_length) for j in range(self.row_length)
+                if self.is_conflict(i, j)]
+
+    '''
+    Returns whether the board is full and no value repeats in any row, column or box
+
+    Parameters: None
+    Return: boolean
+    '''
+    def check_board(self):
+        return self.is_full() and self.duplicates == 0
+
+    '''
+    Returns the solution of the original puzzle, solving it if none was given
+
+    Parameters: None
+    Return: list[list], or None if the puzzle cannot be solved
+    '''
+    def get_solution(self):
+        if self.solution is None:
+            solution = sudoku_solver.solve(self.original_board, variant=self.variant, instrument=self.instrument)
+            if solution is None:
+                return None
+            self.solution = flatten(solution)
+        n = self.row_length
+        return [list(self.solution[i:i + n]) for i in range(0, n * n, n)]
+
+    '''
+    Fills every cell with the solution and removes all sketches
+
+    Parameters: None
+    Return:
+    boolean (False if the puzzle has no solution)
+    '''
+    def solve(self):
+        # Solve the puzzle as given rather than trusting the stored answer
+        solution = sudoku_solver.solve(self.original_board, variant=self.variant, instrument=self.instrument)
+        if solution is not None:
+            solution = flatten(solution)
+        elif self.solution is not None:
+            solution = self.solution
+        else:
+            return False
+        for index, num in enumerate(solution):
+            self.set_index(index, num)
+        self.sketches[:] = bytes(len(self.sketches))
+        return True
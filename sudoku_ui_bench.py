@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # Must be set before pygame opens a window
+import pygame
+import sudoku
+from sudoku_bench import compare, summarize
+"""
+Headless benchmark of the game's user interface
+Runs the game with SDL's dummy video driver, so no display is needed, and plays
+scripted sessions through the same event queue the real game loop reads:
+events are posted, taken with pygame.event.wait/get, handled by Game and drawn,
+exactly as in sudoku.main (without the frame rate cap). For every frame it
+records the time spent handling events, the time spent drawing and the latency
+from posting the events to the end of the frame that showed them.
+
+Results can be saved and compared like sudoku_bench.py; the compared figure is
+the median event-to-frame latency.
+
+Usage:
+python3 sudoku_ui_bench.py --games 5 --save ui_baseline.json
+"""
+
+
+'''
+Returns the key that types value, preferring the main keyboard over the keypad
+
+Parameters:
+value is a cell value
+
+Return: a pygame key constant
+'''
+def key_for(value):
+    for key, digit in sudoku.DIGIT_KEYS.items():
+        if digit == value:
+            return key
+    raise ValueError(f"no key types {value}")
+
+
+def click(pos):
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)
+
+
+def press(key):
+    return pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode="", scancode=0)
+
+
+'''
+Returns the centre of a cell on the screen
+
+Parameters:
+board is the Board being played
+row and col are the row index and col index of the cell
+
+Return: tuple (x, y)
+'''
+def cell_center(board, row, col):
+    return (col * board.cell_size + board.cell_size // 2, row * board.cell_size + board.cell_size // 2)
+
+
+'''
+Starts a game from the start screen
+
+Parameters:
+game is the Game, on its start screen
+box_length is the box size to pick
+difficulty is the difficulty to pick
+
+Return: generator of event batches, one per frame
+'''
+def start_game(game, box_length, difficulty):
+    if game.box_length != box_length:
+        yield [click(game.size_buttons[box_length].center)]
+    yield [click(game.buttons[difficulty].center)]
+
+
+'''
+Plays one game: fills some cells (a few wrongly, then clearing them), resets,
+solves and returns to the start screen
+
+Parameters:
+game is the Game, on its start screen
+rng is the random.Random choosing cells and mistakes
+box_length is the box size to play
+moves is the most cells to fill
+
+Return: generator of event batches, one per frame
+'''
+def play_session(game, rng, box_length, moves):
+    yield from start_game(game, box_length, 'easy')
+    board = game.board
+    solution = board.board.get_solution()
+    empty = [(row, col) for row in range(board.size) for col in range(board.size)
+             if board.board.get(row, col) == 0]
+    rng.shuffle(empty)
+    # Leave one cell empty so the game does not end before reset and solve
+    for row, col in empty[:min(moves, len(empty) - 1)]:
+        yield [click(cell_center(board, row, col))]
+        if rng.random() < 0.2:
+            wrong = rng.randrange(1, board.size + 1)
+            yield [press(key_for(wrong))]
+            yield [press(pygame.K_RETURN)]
+            yield [press(pygame.K_BACKSPACE)]
+        yield [press(key_for(solution[row][col]))]
+        yield [press(pygame.K_RETURN)]
+    reset, restart, _, solve = game.menu
+    yield [click(reset.center)]
+    yield [click(solve.center)]
+    yield [click(restart.center)]
+
+
+'''
+Starts a game and moves the selection around with the arrow keys, sketching as it goes
+
+Parameters:
+game is the Game, on its start screen
+rng is the random.Random choosing directions and digits
+box_length is the box size to play
+moves is the number of arrow key presses
+
+Return: generator of event batches, one per frame
+'''
+def navigate_session(game, rng, box_length, moves):
+    yield from start_game(game, box_length, 'medium')
+    board = game.board
+    yield [click(cell_center(board, 0, 0))]
+    arrows = list(sudoku.ARROW_KEYS)
+    for _ in range(moves):
+        yield [press(rng.choice(arrows)), press(key_for(rng.randrange(1, board.size + 1)))]
+    yield [click(game.menu[1].center)]
+
+
+SESSIONS = {
+    'play': play_session,
+    'navigate': navigate_session,
+}
+
+
+'''
+Feeds event batches through the event queue and the game, one frame per batch,
+the way sudoku.main does
+
+Parameters:
+game is the Game
+batches is an iterable of lists of events
+
+Return: dict of lists of seconds: handle, draw, frame and latency per frame
+'''
+def run_frames(game, batches):
+    timings = {'handle': [], 'draw': [], 'frame': [], 'latency': []}
+    pygame.event.clear()
+    for batch in batches:
+        posted = time.perf_counter()
+        for event in batch:
+            pygame.event.post(event)
+        remaining = len(batch)
+        while remaining:
+            start = time.perf_counter()
+            events = [pygame.event.wait()] + pygame.event.get()
+            for event in events:
+                game.handle_event(event)
+            handled = time.perf_counter()
+            game.draw()
+            end = time.perf_counter()
+            remaining -= sum(1 for event in events if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN))
+            timings['handle'].append(handled - start)
+            timings['draw'].append(end - handled)
+            timings['frame'].append(end - start)
+        timings['latency'].append(end - posted)
+    return timings
+
+
+'''
+Runs every session games times and summarises the frame timings
+
+Parameters:
+args is the parsed command line
+
+Return: dict mapping session names to result dicts
+'''
+def run_sessions(args):
+    random.seed(args.seed)  # Boards are generated from the shared random module
+    game = sudoku.Game()
+    results = {}
+    for name, session in SESSIONS.items():
+        if args.only and name not in args.only:
+            continue
+        timings = {'handle': [], 'draw': [], 'frame': [], 'latency': []}
+        for i in range(args.games):
+            rng = random.Random(f"{args.seed}:{name}:{i}")
+            for key, values in run_frames(game, session(game, rng, args.box_length, args.moves)).items():
+                timings[key].extend(values)
+        latency = summarize(timings['latency'])
+        results[name] = {
+            **latency,
+            'frames': len(timings['frame']),
+            'fps': len(timings['frame']) / sum(timings['frame']),
+            'draw': summarize(timings['draw']),
+            'handle': summarize(timings['handle']),
+        }
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the game's drawing and input handling headless.")
+    parser.add_argument("--games", type=int, default=3, help="times each session is played (default: 3)")
+    parser.add_argument("--moves", type=int, default=30, help="moves per session (default: 30)")
+    parser.add_argument("--box-length", type=int, default=3, choices=[2, 3, 4, 5],
+                        help="box size of the boards played (default: 3, a 9x9 board)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--only", nargs="+", choices=list(SESSIONS), help="sessions to run (default: all)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare against results saved with --save")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative median latency increase counted as a regression (default: 0.1)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_sessions(args)
+    print(f"{'session':<12}{'frames':>8}{'fps':>10}{'draw ms':>10}{'draw p99':>10}"
+          f"{'latency ms':>12}{'p90':>10}{'p99':>10}")
+    for name, result in results.items():
+        print(f"{name:<12}{result['frames']:>8}{result['fps']:>10.1f}{result['draw']['median'] * 1000:>10.3f}"
+              f"{result['draw']['p99'] * 1000:>10.3f}{result['median'] * 1000:>12.3f}"
+              f"{result['p90'] * 1000:>10.3f}{result['p99'] * 1000:>10.3f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({'video_driver': os.environ["SDL_VIDEODRIVER"], 'seed': args.seed, 'cases': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+import functools
+import itertools
+import random
+import sudoku_solver
+from sudoku_generator import SudokuGenerator
+from sudoku_instrument import phase
+from sudoku_state import BoardState
+"""
+Variant rules on top of classic sudoku
+A Variant declares the extra rules of a puzzle and compiles them, once, into
+the tables the rest of the code already runs on:
+
+    diagonal  both main diagonals hold every digit once (extra units)
+    windoku   box-sized windows between the boxes hold every digit once (extra
+              units; 4x4 and 9x9 boards only, larger ones are rarely fillable)
+    even_odd  some cells are marked even or odd (a digit bitmask per cell)
+    killer    cages of cells whose digits differ and add up to the cage's sum
+
+Extra units join the rows, columns and boxes, so solving, generating and
+checking a diagonal or windoku board works exactly like a classic one. Cages
+keep the combinations of digits that can make up their sums, which the solver's
+propagation narrows with. Even/odd marks and cages are drawn from a finished
+solution (they describe it), so generate_variant builds them after filling.
+
+VariantGenerator and VariantState are the generator and board state for variant
+boards; classic boards keep using SudokuGenerator and BoardState, whose hot
+paths have no variant checks at all.
+
+Usage:
+puzzle, solution, variant = generate_variant(3, ('diagonal', 'killer'), 50)
+sudoku_solver.count_solutions(puzzle, 2, variant=variant)
+"""
+
+
+RULES = ('diagonal', 'windoku', 'even_odd', 'killer')
+
+# Largest cage random_cages makes
+MAX_CAGE_SIZE = 4
+
+# Share of the cells random_parity marks as even or odd
+PARITY_SHARE = 0.5
+
+
+'''
+Returns the top-left cells of the windoku windows of a board
+The windows are box-sized squares one cell in from the box borders, as on the
+usual 9x9 windoku board (windows at rows and columns 1 and 5)
+
+Parameters:
+box_length is the side length of one box
+
+Return: list of tuples (row, col)
+'''
+def windows(box_length):
+    starts = [1 + k * (box_length + 1) for k in range(box_length - 1)]
+    return [(row, col) for row in starts for col in starts]
+
+
+'''
+Returns the (cached) digit combinations for cages of one size
+Each combination is a bitmask with bit num - 1 set for every digit in it
+
+Parameters:
+n is the number of digits on the board
+size is the number of cells in the cage
+
+Return: dict mapping each possible sum to a tuple of bitmasks
+'''
+@functools.lru_cache(maxsize=None)
+def cage_combinations(n, size):
+    combos = {}
+    for digits in itertools.combinations(range(1, n + 1), size):
+        mask = 0
+        for num in digits:
+            mask |= 1 << (num - 1)
+        combos.setdefault(sum(digits), []).append(mask)
+    return {total: tuple(masks) for total, masks in combos.items()}
+
+
+class Variant:
+    '''
+    Compiles a set of rules for a board
+    The compiled tables are:
+    units       - every row, column and box, then the extra units (all cells of
+                  a unit hold different digits and every digit appears once)
+    groups      - the units followed by the cells of each cage (digits differ)
+    cell_groups - for each cell, the indexes of the groups it belongs to
+    peers       - for each cell, every other cell sharing a group with it
+    cell_masks  - for each cell, the digits it may hold (even/odd marks)
+    cage_of     - for each cell, the index of its cage, or -1
+    solver_cages - (cells, combinations) for each cage, for sudoku_solver
+
+    Parameters:
+    box_length is the side length of one box
+    diagonal adds both main diagonals as units
+    windoku adds the windows from windows() as units (box_length 3 at most)
+    cages is a sequence of (sum, cells) pairs, cells being flat cell indexes
+    parity is a string with one character per cell: 'e' for even, 'o' for odd
+    and '.' for no mark, or None for no marks at all
+
+    Return:
+    None
+    '''
+    def __init__(self, box_length, diagonal=False, windoku=False, cages=(), parity=None):
+        n = box_length * box_length
+        self.box_length = box_length
+        self.row_length = n
+        self.diagonal = diagonal
+        self.windoku = windoku
+        self.cages = tuple((total, tuple(sorted(cells))) for total, cells in cages)
+        self.parity = parity
+        if windoku and box_length > 3:
+            raise ValueError("windoku is only available on boards up to 9x9")
+        if parity is not None and len(parity) != n * n:
+            raise ValueError(f"parity needs one mark per cell ({n * n})")
+
+        units = [tuple(unit) for unit in sudoku_solver.sudoku_units(box_length)]
+        if diagonal:
+            units.append(tuple(i * n + i for i in range(n)))
+            units.append(tuple(i * n + n - 1 - i for i in range(n)))
+        if windoku:
+            for row, col in windows(box_length):
+                units.append(tuple((row + i) * n + col + j for i in range(box_length) for j in range(box_length)))
+        self.units = tuple(units)
+        self.groups = self.units + tuple(cells for _, cells in self.cages)
+
+        cell_groups = [[] for _ in range(n * n)]
+        for g, group in enumerate(self.groups):
+            for cell in group:
+                cell_groups[cell].append(g)
+        self.cell_groups = tuple(tuple(groups) for groups in cell_groups)
+        self.peers = tuple(tuple(sorted({other for g in groups for other in self.groups[g]} - {cell}))
+                           for cell, groups in enumerate(self.cell_groups))
+
+        full = (1 << n) - 1
+        even = sum(1 << (num - 1) for num in range(2, n + 1, 2))
+        marks = {'.': full, 'e': even, 'o': full & ~even}
+        self.cell_masks = tuple(marks[mark] for mark in parity) if parity is not None else (full,) * (n * n)
+
+        self.cage_of = [-1] * (n * n)
+        solver_cages = []
+        for c, (total, cells) in enumerate(self.cages):
+            for cell in cells:
+                if self.cage_of[cell] >= 0:
+                    raise ValueError(f"cell {cell} is in two cages")
+                self.cage_of[cell] = c
+            combos = cage_combinations(n, len(cells)).get(total, ())
+            solver_cages.append((cells, combos))
+        self.solver_cages = tuple(solver_cages)
+
+    '''
+    Returns the names of the rules in force, in RULES order
+
+    Parameters: None
+    Return: tuple of str
+    '''
+    @property
+    def rules(self):
+        flags = (self.diagonal, self.windoku, self.parity is not None, bool(self.cages))
+        return tuple(name for name, flag in zip(RULES, flags) if flag)
+
+    '''
+    Returns a copy of this variant with cages and even/odd marks replaced
+
+    Parameters:
+    cages and parity are as for Variant
+
+    Return: Variant
+    '''
+    def with_marks(self, cages=(), parity=None):
+        return Variant(self.box_length, self.diagonal, self.windoku, cages, parity)
+
+
+class VariantGenerator(SudokuGenerator):
+    '''
+    A SudokuGenerator whose board also follows a variant's rules
+    The groups the variant adds to the rows, columns and boxes (extra units and
+    cages) get digit bitmasks of their own, kept up to date by place/unplace
+
+    Parameters:
+    row_length and removed_cells are as for SudokuGenerator
+    variant is the Variant, for a board of this size
+    rng and instrument are as for SudokuGenerator
+
+    Return:
+    None
+    '''
+    def __init__(self, row_length, removed_cells, variant, rng=None, instrument=None):
+        super().__init__(row_length, removed_cells, rng, instrument)
+        self.set_variant(variant)
+
+    '''
+    Sets the variant rules the board follows, rebuilding the bitmasks of its
+    extra groups from the current board
+
+    Parameters:
+    variant is a Variant for a board of this size
+
+    Return: None
+    '''
+    def set_variant(self, variant):
+        if variant.row_length != self.row_length:
+            raise ValueError("the variant is for a different board size")
+        self.variant = variant
+        classic = 3 * self.row_length  # Rows, columns and boxes come first in variant.groups
+        self.extra_used = [0] * (len(variant.groups) - classic)
+        self.cell_extra = [tuple(g - classic for g in groups if g >= classic) for groups in variant.cell_groups]
+        for row in range(self.row_length):
+            for col in range(self.row_length):
+                if self.board[row][col]:
+                    bit = 1 << (self.board[row][col] - 1)
+                    for g in self.cell_extra[row * self.row_length + col]:
+                        self.extra_used[g] |= bit
+
+    '''
+    Returns a bitmask of the digits that can still be entered at (row, col),
+    leaving out the digits of the cell's extra units and cage and the digits
+    its even/odd mark rules out
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: int
+    '''
+    def candidates(self, row, col):
+        index = row * self.row_length + col
+        mask = super().candidates(row, col) & self.variant.cell_masks[index]
+        for g in self.cell_extra[index]:
+            mask &= ~self.extra_used[g]
+        return mask
+
+    '''
+    Determines if it is valid to enter num at (row, col) under the classic and
+    the variant rules
+
+    Parameters:
+    row and col are the row index and col index of the cell
+    num is the value to test
+
+    Return: boolean
+    '''
+    def is_valid(self, row, col, num):
+        return super().is_valid(row, col, num) and self.candidates(row, col) & (1 << (num - 1)) != 0
+
+    # place and unplace also keep the bitmasks of the extra groups
+    def place(self, row, col, num):
+        super().place(row, col, num)
+        bit = 1 << (num - 1)
+        for g in self.cell_extra[row * self.row_length + col]:
+            self.extra_used[g] |= bit
+
+    def unplace(self, row, col):
+        bit = ~(1 << (self.board[row][col] - 1))
+        super().unplace(row, col)
+        for g in self.cell_extra[row * self.row_length + col]:
+            self.extra_used[g] &= bit
+
+    '''
+    Constructs a solution; boards whose variant has no rules of its own are
+    filled the classic way
+    Filling the diagonal boxes first could already break a diagonal or windoku
+    rule, so other boards come whole from fill_random instead
+
+    Parameters:
+    exact is as for SudokuGenerator.fill_values
+
+    Return: None
+    '''
+    def fill_values(self, exact=None):
+        if not self.variant.rules:
+            super().fill_values(exact)
+            return
+        with phase(self.instrument, 'fill_variant'):
+            self.fill_random()
+        self.solution_board = [row[:] for row in self.board]
+
+
+class VariantState(BoardState):
+    '''
+    A BoardState for a board with variant rules
+    Extra units and cages are counted like rows, columns and boxes; even/odd
+    marks that are broken and cages with a wrong sum are kept as one count
+
+    Parameters:
+    puzzle and solution are as for BoardState
+    variant is the Variant
+
+    Return:
+    None
+    '''
+    def __init__(self, puzzle, solution, variant):
+        self.variant = variant
+        self.cage_sums = [0] * len(variant.cages)
+        self.cage_filled = [0] * len(variant.cages)
+        self.broken = 0  # Values against their even/odd mark plus cages with a wrong sum
+        super().__init__(puzzle, solution)
+
+    '''
+    Writes num into the cell at a flat index, updating the digit counts of its
+    units and cage and the count of broken rules
+
+    Parameters:
+    index is the flat index of the cell
+    num is the value to write, 0 to empty the cell
+
+    Return: None
+    '''
+    def set_index(self, index, num):
+        old = self.values[index]
+        if old == num:
+            return
+        super().set_index(index, num)
+        mask = self.variant.cell_masks[index]
+        if old and not mask & (1 << (old - 1)):
+            self.broken -= 1
+        if num and not mask & (1 << (num - 1)):
+            self.broken += 1
+        c = self.variant.cage_of[index]
+        if c >= 0:
+            self.broken -= self.cage_broken(c)
+            self.cage_sums[c] += num - old
+            self.cage_filled[c] += (num != 0) - (old != 0)
+            self.broken += self.cage_broken(c)
+
+    '''
+    Returns whether the values in a cage already add up to more than its sum,
+    or fill it and add up to something else
+
+    Parameters:
+    c is the index of the cage in variant.cages
+
+    Return: boolean
+    '''
+    def cage_broken(self, c):
+        total, cells = self.variant.cages[c]
+        return self.cage_sums[c] > total or (self.cage_filled[c] == len(cells) and self.cage_sums[c] != total)
+
+    '''
+    Determines if num could be entered at (row, col): no repeat in any unit or
+    cage, allowed by the cell's even/odd mark and keeping the cage's sum possible
+
+    Parameters:
+    row and col are the row index and col index of the cell
+    num is the value to test
+
+    Return: boolean
+    '''
+    def is_valid(self, row, col, num):
+        if not super().is_valid(row, col, num):
+            return False
+        index = row * self.row_length + col
+        if not self.variant.cell_masks[index] & (1 << (num - 1)):
+            return False
+        c = self.variant.cage_of[index]
+        if c >= 0:
+            total, cells = self.variant.cages[c]
+            old = self.values[index]
+            cage_sum = self.cage_sums[c] - old + num
+            filled = self.cage_filled[c] + (old == 0)
+            if cage_sum > total or (filled == len(cells) and cage_sum != total):
+                return False
+        return True
+
+    '''
+    Returns whether the value at (row, col) repeats in one of its units or its
+    cage, breaks its even/odd mark or is in a cage with a wrong sum
+
+    Parameters:
+    row and col are the row index and col index of the cell
+
+    Return: boolean
+    '''
+    def is_conflict(self, row, col):
+        if super().is_conflict(row, col):
+            return True
+        index = row * self.row_length + col
+        num = self.values[index]
+        if num == 0 or not self.broken:
+            return False
+        if not self.variant.cell_masks[index] & (1 << (num - 1)):
+            return True
+        c = self.variant.cage_of[index]
+        return c >= 0 and self.cage_broken(c)
+
+    '''
+    Returns the values that could still go in the cell at a flat index: besides
+    the units, the even/odd mark applies, and in a cage only digits of a
+    combination that fits both its sum and the digits already in it are left
+
+    Parameters:
+    index is the flat index of the cell
+
+    Return: int bitmask (bit num - 1 set when num is possible), 0 for a filled cell
+    '''
+    def candidate_mask(self, index):
+        mask = super().candidate_mask(index) & self.variant.cell_masks[index]
+        c = self.variant.cage_of[index]
+        if mask and c >= 0:
+            placed = self.unit_masks[self.full_units + c]
+            allowed = 0
+            for combo in self.variant.solver_cages[c][1]:
+                if combo & placed == placed:
+                    allowed |= combo
+            mask &= allowed
+        return mask
+
+    '''
+    Returns the next move when there are no singles. The grader only knows the
+    classic rules, so the most constrained cell gets its value from the solution
+
+    Parameters:
+    cands is the list of candidate bitmasks of every cell
+
+    Return: tuple (row, col, value, technique name), or None
+    '''
+    def harder_move(self, cands):
+        if not self.variant.rules:
+            return super().harder_move(cands)
+        if self.get_solution() is None:
+            return None
+        empty = [index for index, num in enumerate(self.values) if num == 0]
+        index = min(empty, key=lambda i: cands[i].bit_count())
+        return index // self.row_length, index % self.row_length, self.solution[index], 'guess'
+
+    def conflicting_cells(self):
+        if self.duplicates == 0 and self.broken == 0:
+            return []
+        return [(i, j) for i in range(self.row_length) for j in range(self.row_length)
+                if self.is_conflict(i, j)]
+
+    def check_board(self):
+        return super().check_board() and self.broken == 0
+
+
+'''
+Splits a solved board into killer cages
+Cages grow from random cells into random neighbours (sharing an edge) until
+they reach a random size of 2 to max_size cells; a neighbour is only taken if
+its digit is not in the cage yet. Cells left with no free neighbour become
+one-cell cages
+
+Parameters:
+solution is a 2D list of ints
+rng is the random.Random to draw from
+max_size is the largest cage to make
+
+Return: list of tuples (sum, cells)
+'''
+def random_cages(solution, rng, max_size=MAX_CAGE_SIZE):
+    n = len(solution)
+    flat = [value for row in solution for value in row]
+    free = set(range(n * n))
+    order = list(range(n * n))
+    rng.shuffle(order)
+    cages = []
+    for start in order:
+        if start not in free:
+            continue
+        free.discard(start)
+        cells = [start]
+        digits = 1 << (flat[start] - 1)
+        size = rng.randint(2, max_size)
+        while len(cells) < size:
+            options = []
+            for cell in cells:
+                row, col = divmod(cell, n)
+                for r, c in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+                    other = r * n + c
+                    if 0 <= r < n and 0 <= c < n and other in free and not digits & (1 << (flat[other] - 1)):
+                        options.append(other)
+            if not options:
+                break
+            cell = rng.choice(options)
+            free.discard(cell)
+            cells.append(cell)
+            digits |= 1 << (flat[cell] - 1)
+        cages.append((sum(flat[cell] for cell in cells), tuple(sorted(cells))))
+    return cages
+
+
+'''
+Marks a share of the cells of a solved board as even or odd
+
+Parameters:
+solution is a 2D list of ints
+rng is the random.Random to draw from
+share is the probability that a cell is marked
+
+Return: str of 'e', 'o' and '.' marks, one per cell
+'''
+def random_parity(solution, rng, share=PARITY_SHARE):
+    return "".join(('o' if value % 2 else 'e') if rng.random() < share else '.'
+                   for row in solution for value in row)
+
+
+'''
+Generates a variant puzzle
+The solution is filled under the diagonal and windoku rules, the cages and
+even/odd marks are then drawn from it, and cells are removed with uniqueness
+checks that know every rule
+
+Parameters:
+box_length is the side length of one box
+rules is an iterable of names from RULES
+removed is the number of cells to clear (ignored when minimal is set)
+rng is the random.Random to draw from (defaults to the shared random module)
+unique is whether the puzzle must keep a single solution
+minimal is whether to remove clues until every clue left is needed
+instrument is a sudoku_instrument.Instrument to report to, or None
+
+Return: tuple (puzzle, solution, variant)
+'''
+def generate_variant(box_length, rules, removed, rng=None, unique=True, minimal=False, instrument=None):
+    rules = set(rules)
+    unknown = rules - set(RULES)
+    if unknown:
+        raise ValueError(f"unknown rules: {', '.join(sorted(unknown))}")
+    rng = rng if rng is not None else random
+    variant = Variant(box_length, 'diagonal' in rules, 'windoku' in rules)
+    generator = VariantGenerator(box_length * box_length, removed, variant, rng, instrument)
+    generator.fill_values()
+    solution = generator.get_solution()
+    if 'killer' in rules or 'even_odd' in rules:
+        variant = variant.with_marks(random_cages(solution, rng) if 'killer' in rules else (),
+                                     random_parity(solution, rng) if 'even_odd' in rules else None)
+        generator.set_variant(variant)
+    if minimal:
+        generator.remove_cells_minimal()
+    else:
+        generator.remove_cells(unique)
+    return generator.get_board(), solution, variant
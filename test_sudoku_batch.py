@@ -0,0 +1,38 @@
+import pytest
+import sudoku_solver
+from sudoku_batch import generate_chunk
+from sudoku_grader import grade_puzzle
+"""
+Tests for sudoku_batch
+"""
+
+
+def parse_line(line):
+    difficulty, puzzle, solution = line.strip().split(",")
+    return (difficulty, [[int(puzzle[row * 9 + col]) for col in range(9)] for row in range(9)],
+            [[int(solution[row * 9 + col]) for col in range(9)] for row in range(9)])
+
+
+def is_minimal(puzzle):
+    clues = [(row, col) for row in range(9) for col in range(9) if puzzle[row][col]]
+    for row, col in clues:
+        value, puzzle[row][col] = puzzle[row][col], 0
+        unique = sudoku_solver.count_solutions(puzzle, 2) == 1
+        puzzle[row][col] = value
+        if unique:
+            return False
+    return True
+
+
+@pytest.mark.parametrize("graded", [False, True])
+def test_minimal_chunks_give_minimal_puzzles(graded):
+    # task: seed, difficulty, chunk index, count, unique, variants, graded, minimal
+    lines = generate_chunk((1, 'hard', 0, 3, True, 1, graded, True))
+    assert len(lines) == 3
+    for line in lines:
+        difficulty, puzzle, solution = parse_line(line)
+        assert difficulty == 'hard'
+        assert sudoku_solver.solve_all(puzzle, 2) == [solution]
+        assert is_minimal(puzzle)
+        if graded:
+            assert grade_puzzle(puzzle)[0] == 'hard'
@@ -0,0 +1,23 @@
+import random
+import numpy as np
+import sudoku_check
+from sudoku_generator import generate_puzzle
+"""
+Tests for sudoku_check
+"""
+
+
+def test_check_grids_across_chunks(monkeypatch):
+    rng = random.Random(0)
+    for box_length in (2, 3, 4):
+        n = box_length * box_length
+        # Three boards per chunk
+        monkeypatch.setattr(sudoku_check, 'CHUNK_BYTES', 3 * n ** 3)
+        solution = np.array(generate_puzzle(n, 0, rng, unique=False)[1], dtype=np.uint8)
+        grids = np.repeat(solution[None], 10, axis=0)
+        grids[4, 0, 0] = 0
+        grids[7, 0, 0] = grids[7, 0, 1]
+        valid, complete, conflicts = sudoku_check.check_grids(grids)
+        assert valid.tolist() == [k != 7 for k in range(10)]
+        assert complete.tolist() == [k != 4 for k in range(10)]
+        assert conflicts[7, 0, 0] and conflicts[7, 0, 1] and conflicts.sum() == 3
@@ -0,0 +1,83 @@
+import random
+import pytest
+import sudoku_solver
+from sudoku_generator import SudokuGenerator, fill_order, generate_minimal, generate_puzzle, removed_for_size
+"""
+Tests for sudoku_generator
+"""
+
+
+def is_complete_solution(board, box_length):
+    n = box_length * box_length
+    digits = list(range(1, n + 1))
+    return (len(board) == n
+            and all(sorted(board[row][col] for col in range(n)) == digits for row in range(n))
+            and all(sorted(board[row][col] for row in range(n)) == digits for col in range(n))
+            and all(sorted(board[r][c] for r in range(br, br + box_length) for c in range(bc, bc + box_length)) == digits
+                    for br in range(0, n, box_length) for bc in range(0, n, box_length)))
+
+
+def is_minimal(puzzle):
+    if sudoku_solver.count_solutions(puzzle, 2) != 1:
+        return False
+    for row, values in enumerate(puzzle):
+        for col, value in enumerate(values):
+            if value:
+                puzzle[row][col] = 0
+                unique = sudoku_solver.count_solutions(puzzle, 2) == 1
+                puzzle[row][col] = value
+                if unique:
+                    return False
+    return True
+
+
+# 4x4 boards often get diagonal boxes that cannot be completed, so many seeds are tried there
+@pytest.mark.parametrize("box_length, seeds", [(2, 200), (3, 50), (4, 5)])
+def test_fill_values_gives_complete_solutions(box_length, seeds):
+    for seed in range(seeds):
+        generator = SudokuGenerator(box_length * box_length, 0, random.Random(seed))
+        generator.fill_values()
+        assert is_complete_solution(generator.get_solution(), box_length), seed
+        assert generator.get_board() == generator.get_solution()
+
+
+@pytest.mark.parametrize("box_length", [2, 3, 4])
+@pytest.mark.parametrize("difficulty", ['easy', 'hard'])
+def test_generate_puzzle_gives_unique_puzzles(box_length, difficulty):
+    n = box_length * box_length
+    removed = removed_for_size(difficulty, n)
+    for seed in range(3):
+        puzzle, solution = generate_puzzle(n, removed, random.Random(seed))
+        assert is_complete_solution(solution, box_length), seed
+        assert sum(row.count(0) for row in puzzle) == removed
+        assert all(puzzle[row][col] in (0, solution[row][col]) for row in range(n) for col in range(n))
+        assert sudoku_solver.count_solutions(puzzle, 2) == 1
+
+
+@pytest.mark.parametrize("box_length", [2, 3, 4, 5])
+def test_fill_order_is_shared_and_skips_the_diagonal_boxes(box_length):
+    n = box_length * box_length
+    order = fill_order(box_length)
+    assert fill_order(box_length) is order
+    assert len(order) == n * n - n * n // box_length
+    assert all(row // box_length != col // box_length for row, col, _ in order)
+    assert [(row, col) for row, col, _ in order] == sorted((row, col) for row, col, _ in order)
+
+
+@pytest.mark.parametrize("box_length", [2, 3])
+def test_generate_minimal_gives_minimal_puzzles(box_length):
+    n = box_length * box_length
+    for seed in range(5):
+        puzzle, solution = generate_minimal(n, random.Random(seed))
+        assert is_complete_solution(solution, box_length), seed
+        assert all(puzzle[row][col] in (0, solution[row][col]) for row in range(n) for col in range(n))
+        assert is_minimal(puzzle), seed
+
+
+def test_remove_cells_minimal_leaves_every_clue_needed():
+    generator = SudokuGenerator(9, 0, random.Random(8))
+    generator.fill_values()
+    generator.remove_cells_minimal()
+    puzzle = generator.get_board()
+    assert is_minimal(puzzle)
+    assert all(puzzle[row][col] in (0, generator.get_solution()[row][col]) for row in range(9) for col in range(9))
@@ -0,0 +1,38 @@
+import random
+import pytest
+import sudoku_solver
+from sudoku_grader import GRADES, GUESS, Grader, generate_graded, grade_puzzle
+"""
+Tests for sudoku_grader
+"""
+
+
+@pytest.mark.parametrize("difficulty", GRADES)
+def test_generate_graded_gives_the_grade_asked_for(difficulty):
+    rng = random.Random(difficulty)
+    for _ in range(5):
+        puzzle, solution = generate_graded(difficulty, rng)
+        assert grade_puzzle(puzzle)[0] == difficulty
+        assert sudoku_solver.count_solutions(puzzle, 2) == 1
+        assert all(puzzle[row][col] in (0, solution[row][col]) for row in range(9) for col in range(9))
+
+
+def test_generate_graded_raises_when_out_of_attempts():
+    with pytest.raises(RuntimeError):
+        generate_graded('medium', random.Random(0), attempts=0)
+
+
+# The grader only ever places digits it has proved, so whatever it fills in must
+# match the solver's solution, and it must finish every puzzle it does not grade hard
+@pytest.mark.parametrize("difficulty", GRADES)
+def test_grader_places_only_correct_digits(difficulty):
+    rng = random.Random(f"sound:{difficulty}")
+    for _ in range(5):
+        puzzle, _ = generate_graded(difficulty, rng)
+        solution = sudoku_solver.solve(puzzle)
+        grader = Grader(puzzle)
+        _, technique, _ = grader.grade()
+        assert all(value in (0, solution[cell // 9][cell % 9]) for cell, value in enumerate(grader.values))
+        assert not grader.broken
+        if technique != GUESS[0]:
+            assert grader.empty == 0
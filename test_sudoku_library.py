@@ -0,0 +1,65 @@
+import io
+import random
+import pytest
+from sudoku_generator import DIFFICULTY_REMOVED, generate_puzzle
+from sudoku_grader import grade_puzzle
+from sudoku_library import PuzzleLibrary, read_batch_lines, write_library
+"""
+Tests for sudoku_library
+"""
+
+
+def board_to_string(board):
+    return "".join(str(value) for row in board for value in row)
+
+
+def test_library_round_trip(tmp_path):
+    rng = random.Random(3)
+    entries = []
+    for difficulty, grade in [('easy', 'easy'), ('easy', None), ('hard', 'medium')]:
+        puzzle, solution = generate_puzzle(9, 40, rng)
+        entries.append((difficulty, puzzle, solution, grade))
+    path = str(tmp_path / "puzzles.sdk")
+    assert write_library(path, entries) == {'easy': 2, 'medium': 0, 'hard': 1}
+    with PuzzleLibrary(path) as library:
+        assert library.count() == 3 and library.count('medium') == 0
+        assert [library.get('easy', 0), library.get('easy', 1), library.get('hard', 0)] == entries
+
+
+def test_batch_lines_round_trip(tmp_path):
+    puzzle, solution = generate_puzzle(9, 45, random.Random(5))
+    lines = io.StringIO(f"medium,{board_to_string(puzzle)},{board_to_string(solution)}\n\n")
+    path = str(tmp_path / "puzzles.sdk")
+    write_library(path, read_batch_lines(lines))
+    with PuzzleLibrary(path) as library:
+        assert not library.graded
+        assert library.take('medium') == (puzzle, solution)
+
+
+def test_graded_libraries_file_puzzles_by_grade(tmp_path):
+    puzzle, solution = generate_puzzle(9, 30, random.Random(6))
+    grade = grade_puzzle(puzzle)[0]
+    label = next(difficulty for difficulty in DIFFICULTY_REMOVED if difficulty != grade)
+    lines = io.StringIO(f"{label},{board_to_string(puzzle)},{board_to_string(solution)}\n")
+    path = str(tmp_path / "graded.sdk")
+    write_library(path, read_batch_lines(lines, grade=True), graded=True)
+    with PuzzleLibrary(path) as library:
+        assert library.graded
+        assert library.count(label) == 0
+        assert library.get(grade, 0) == (grade, puzzle, solution, grade)
+
+
+@pytest.mark.parametrize("graded", [False, True])
+def test_take_generates_missing_difficulties(tmp_path, graded):
+    path = str(tmp_path / "empty.sdk")
+    write_library(path, [], graded=graded)
+    with PuzzleLibrary(path) as library:
+        library.rng = random.Random(7)
+        puzzle, solution = library.take('hard')
+        assert all(value in (0, solution[row][col]) for row in range(9) for col, value in enumerate(puzzle[row]))
+        if graded:
+            assert grade_puzzle(puzzle)[0] == 'hard'
+        else:
+            assert sum(row.count(0) for row in puzzle) == DIFFICULTY_REMOVED['hard']
+        with pytest.raises(ValueError):
+            library.take('extreme')
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import sudoku_server
+from sudoku_server import LINE_LIMIT, PuzzleService, send_requests
+"""
+Tests for sudoku_server
+"""
+
+PUZZLE = "530070000600195000098000060800060003400803001700020006060000280000419005000080079"
+
+
+'''
+Runs coroutine(port) against a service listening on a free local port
+
+Parameters:
+coroutine is an async function taking the port
+pool_size is how many puzzles the service keeps ready per difficulty
+
+Return: what coroutine returns
+'''
+def with_service(coroutine, pool_size=1):
+    async def run():
+        service = PuzzleService(workers=1, pool_size=pool_size, graded=False)
+        await service.start()
+        server = await asyncio.start_server(service.handle_client, "127.0.0.1", 0, limit=LINE_LIMIT)
+        try:
+            return await coroutine(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+            await service.stop()
+    return asyncio.run(run())
+
+
+def test_requests_get_replies_in_order():
+    replies = with_service(lambda port: send_requests("127.0.0.1", port, [
+        {'id': 1, 'op': 'generate', 'difficulty': 'easy'},
+        {'id': 2, 'op': 'validate', 'grid': PUZZLE},
+        {'id': 3, 'op': 'solve', 'grid': PUZZLE},
+    ]))
+    assert [reply['id'] for reply in replies] == [1, 2, 3]
+    assert all(reply['ok'] for reply in replies)
+    assert len(replies[0]['puzzle']) == 81
+    assert replies[1]['valid'] and not replies[1]['complete']
+    assert replies[2]['unique'] and replies[2]['solution'].startswith("534678912")
+
+
+def test_bad_requests_get_error_replies():
+    replies = with_service(lambda port: send_requests("127.0.0.1", port, [
+        {'id': 1, 'op': 'generate', 'difficulty': ['x']},
+        {'id': 2, 'op': 'validate', 'grid': 5},
+        {'id': 3, 'op': 'solve', 'grid': [[0] * 9] * 8},
+        {'id': 4, 'op': 'fly'},
+        [1, 2],
+        {'id': 6, 'op': 'solve', 'grid': PUZZLE},
+    ]))
+    assert [reply['ok'] for reply in replies] == [False] * 5 + [True]
+    assert [reply.get('id') for reply in replies] == [1, 2, 3, 4, None, 6]
+    assert all(reply['error'] for reply in replies[:5])
+
+
+def test_overlong_line_gets_an_error_reply():
+    async def send(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b'{"id": 1, "op": "solve", "grid": "' + b"0" * (3 * LINE_LIMIT) + b'"}\n')
+        writer.write(json.dumps({'id': 2, 'op': 'solve', 'grid': PUZZLE}).encode() + b"\n")
+        await writer.drain()
+        replies = [json.loads(await reader.readline()) for _ in range(2)]
+        writer.close()
+        await writer.wait_closed()
+        return replies
+    too_long, next_reply = with_service(send)
+    assert not too_long['ok'] and "longer" in too_long['error']
+    assert next_reply['id'] == 2 and next_reply['ok']
+
+
+# Stands in for generate_task in the worker processes (forked after it is patched in)
+def failing_generate(difficulty, graded):
+    raise RuntimeError(f"no {difficulty} puzzle")
+
+
+def test_failed_generation_gets_an_error_reply(monkeypatch):
+    monkeypatch.setattr(sudoku_server, "generate_task", failing_generate)
+    replies = with_service(lambda port: send_requests("127.0.0.1", port, [
+        {'id': 1, 'op': 'generate', 'difficulty': 'hard'},
+        {'id': 2, 'op': 'solve', 'grid': PUZZLE},
+    ]), pool_size=0)
+    assert not replies[0]['ok'] and "no hard puzzle" in replies[0]['error']
+    assert replies[1]['ok']
@@ -0,0 +1,34 @@
+import pytest
+import sudoku_solver
+from sudoku_solve import solve_chunk
+"""
+Tests for sudoku_solver and sudoku_solve
+"""
+
+UNIQUE = "530070000600195000098000060800060003400803001700020006060000280000419005000080079"
+SOLUTION = "534678912672195348198342567859761423426853791713924856961537284287419635345286179"
+# SOLUTION with a rectangle of 6s and 7s cleared, which can be filled either way round
+MULTIPLE = "534008912672195348198342567859001423426853791713924856961537284287419635345286179"
+# Two 5s in the first row
+UNSOLVABLE = "550070000600195000098000060800060003400803001700020006060000280000419005000080079"
+
+
+def to_grid(line):
+    return [[int(line[row * 9 + col]) for col in range(9)] for row in range(9)]
+
+
+@pytest.mark.parametrize("engine", ['propagation', 'dlx'])
+def test_count_solutions(engine):
+    assert sudoku_solver.count_solutions(to_grid(UNIQUE), 2, engine=engine) == 1
+    assert sudoku_solver.count_solutions(to_grid(MULTIPLE), engine=engine) == 2
+    assert sudoku_solver.count_solutions(to_grid(UNSOLVABLE), 2, engine=engine) == 0
+    assert sudoku_solver.solve(to_grid(UNIQUE), engine=engine) == to_grid(SOLUTION)
+
+
+@pytest.mark.parametrize("engine", ['propagation', 'dlx'])
+def test_solve_chunk_statuses(engine):
+    lines = [UNIQUE, MULTIPLE, UNSOLVABLE, UNIQUE[:80], UNIQUE[:80] + "x", UNIQUE.replace("0", ".")]
+    results = solve_chunk((lines, engine))
+    assert [status for _, status in results] == ['unique', 'multiple', 'unsolvable', 'invalid', 'invalid', 'unique']
+    assert results[0][0].startswith(f"{UNIQUE},{SOLUTION},unique,")
+    assert results[3][0].startswith(f"{UNIQUE[:80]},,invalid,")
@@ -0,0 +1,73 @@
+import random
+import time
+import pytest
+from sudoku_generator import generate_puzzle, removed_for_size
+from sudoku_grader import generate_graded
+from sudoku_state import BoardState
+from sudoku_variants import RULES, VariantState, generate_variant
+"""
+Tests for sudoku_state
+"""
+
+FRAME = 1 / 60
+
+
+def random_moves(state, rng, moves):
+    n = state.row_length
+    for _ in range(moves):
+        row, col = rng.randrange(n), rng.randrange(n)
+        state.place(row, col, rng.choice([0] + list(range(1, n + 1))))
+        assert state.cands == [state.candidate_mask(index) for index in range(n * n)]
+
+
+@pytest.mark.parametrize("box_length", [2, 3, 4])
+def test_candidates_follow_every_move(box_length):
+    rng = random.Random(box_length)
+    n = box_length * box_length
+    puzzle, solution = generate_puzzle(n, removed_for_size('medium', n), rng)
+    state = BoardState(puzzle, solution)
+    random_moves(state, rng, 200)
+    state.reset()
+    assert state.cands == BoardState(puzzle, solution).cands
+
+
+def test_variant_candidates_follow_every_move():
+    rng = random.Random(4)
+    puzzle, solution, variant = generate_variant(3, RULES, 45, rng)
+    random_moves(VariantState(puzzle, solution, variant), rng, 200)
+
+
+def test_hints_solve_the_puzzle():
+    puzzle, solution = generate_graded('hard', random.Random(2))
+    state = BoardState(puzzle, solution)
+    while (hint := state.hint()) is not None:
+        row, col, value, _ = hint
+        assert value == solution[row][col]
+        state.place(row, col, value)
+    assert state.board == solution
+
+
+def test_mistakes_are_hinted_first():
+    puzzle, solution = generate_graded('easy', random.Random(3))
+    state = BoardState(puzzle, solution)
+    row, col = next((row, col) for row in range(9) for col in range(9) if not puzzle[row][col])
+    state.place(row, col, solution[row][col] % 9 + 1)
+    assert state.hint() == (row, col, solution[row][col], 'mistake')
+
+
+# hint() changes nothing, so each one is timed at its best of three runs to keep
+# the machine's noise out of the check
+def test_large_board_hints_fit_in_a_frame():
+    puzzle, solution = generate_puzzle(25, removed_for_size('hard', 25), random.Random(0))
+    state = BoardState(puzzle, solution)
+    while True:
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            hint = state.hint()
+            times.append(time.perf_counter() - start)
+        assert min(times) < FRAME
+        if hint is None:
+            break
+        state.place(*hint[:3])
+    assert state.board == solution
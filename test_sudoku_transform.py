@@ -0,0 +1,25 @@
+import random
+from sudoku_generator import generate_puzzle
+from sudoku_transform import apply_transform, canonical_form, random_transform
+"""
+Tests for sudoku_transform
+"""
+
+
+def test_canonical_form_is_the_same_for_transformed_boards():
+    rng = random.Random(0)
+    for removed in (0, 40, 60, 75):
+        puzzle, _ = generate_puzzle(9, removed, rng, unique=False)
+        canonical = canonical_form(puzzle)
+        for _ in range(3):
+            assert canonical_form(apply_transform(puzzle, random_transform(3, rng))) == canonical
+
+
+def test_canonical_form_of_nearly_empty_boards():
+    empty = [[0] * 9 for _ in range(9)]
+    assert canonical_form(empty) == empty
+    one = [row[:] for row in empty]
+    one[4][7] = 5
+    expected = [row[:] for row in empty]
+    expected[8][8] = 1
+    assert canonical_form(one) == expected